@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,12 +42,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AuditUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.RoleRequiredMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -73,12 +78,57 @@ WSGI_APPLICATION = 'apartment_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_PROFILE selects the database profile: 'sqlite' (default) or 'postgres'.
+
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'apartment_management'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('DJANGO_DB_POOL') == '1':
+        # psycopg's connection pool (pip install "psycopg[pool]") replaces
+        # persistent connections, which Django refuses to combine with it.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN', '2')),
+                'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX', '10')),
+            },
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Wait up to 20s for the write lock instead of failing with
+                # "database is locked", and take it at BEGIN so two writers
+                # never deadlock upgrading from a read lock.
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                # Run on every new connection. WAL lets readers proceed while a
+                # payment is being written; NORMAL only syncs at checkpoints.
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -116,6 +166,11 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Third-party assets are served from core/static/core/vendor/ (fill it with
+# `manage.py fetch_vendor_assets`). DJANGO_VENDOR_CDN=1 loads them from the
+# CDN instead.
+VENDOR_ASSETS_CDN = os.environ.get('DJANGO_VENDOR_CDN') == '1'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -124,12 +179,95 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 #adding custom user model
 AUTH_USER_MODEL = 'core.CustomUser'
+# EmailBackend accepts an email or a username in a single query. ModelBackend
+# stays listed so sessions that logged in through it remain valid.
 AUTHENTICATION_BACKENDS = [
+    'core.backends.EmailBackend',
     'django.contrib.auth.backends.ModelBackend',
-    'core.backends.EmailBackend',  # Add this
 ]
 
 LOGIN_URL = '/login/'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+# Per-route latency, query count and template timings, reported in a
+# Server-Timing header and at /metrics/. Set DJANGO_REQUEST_METRICS=1 to enable.
+REQUEST_METRICS = os.environ.get('DJANGO_REQUEST_METRICS') == '1'
+# Requests per route kept in the rolling histograms.
+REQUEST_METRICS_WINDOW = 1000
+# Log a warning when the same SQL statement runs more than this many times in
+# one request. None disables the check.
+REQUEST_METRICS_N_PLUS_ONE = 10
+
+# DJANGO_CACHE selects the cache backend: 'locmem' (default, one cache per
+# process) or 'file' (shared by every worker process on the host). With
+# several workers use 'file' so fragment invalidations reach all of them.
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE', 'locmem')
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'apartment-management',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+# Seconds a user loaded by EmailBackend.get_user stays cached. Saves and
+# deletes evict the entry, which only reaches every worker through a shared
+# cache, so per-process caches don't keep users at all.
+AUTH_USER_CACHE_TIMEOUT = 300 if CACHE_BACKEND == 'file' else 0
+# Seconds a rendered list or dashboard fragment is kept. Saves invalidate
+# fragments straight away; this only bounds memory held by stale versions.
+FRAGMENT_CACHE_TIMEOUT = 600
+# Audit log entries are buffered in memory and written by a background thread
+# in batches of AUDIT_BATCH_SIZE, at least every AUDIT_FLUSH_INTERVAL seconds.
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_INTERVAL = 1.0
+
+# DJANGO_PROFILE selects 'development' (default) or 'production'. Production
+# parses every core template at startup into the cached loader, stores static
+# files under content-hashed names with .gz/.br copies (run collectstatic),
+# and serves them from STATIC_ROOT with far-future cache headers.
+DEPLOY_PROFILE = os.environ.get('DJANGO_PROFILE', 'development')
+TEMPLATE_PRECOMPILE = False
+STATIC_SERVE = False
+if DEPLOY_PROFILE == 'production':
+    DEBUG = False
+    ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS'].update({
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', ['django.template.loaders.app_directories.Loader']),
+        ],
+    })
+    TEMPLATE_PRECOMPILE = True
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+    }
+    STATIC_SERVE = True
+
+# DJANGO_SESSIONS selects the session store:
+#   'db' (default)      every request reads django_session, logins write it.
+#   'cached_db'         reads come from SESSION_CACHE_ALIAS, writes still go
+#                       through to the database. With several worker
+#                       processes use DJANGO_CACHE=file so a logout reaches
+#                       every worker's cache.
+#   'signed_cookies'    no server-side storage at all; the session lives in a
+#                       signed (not encrypted) cookie and a logout cannot
+#                       revoke copies of it held elsewhere.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('DJANGO_SESSIONS', 'db')]
+SESSION_CACHE_ALIAS = 'default'
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser
+from .models import CustomUser, LateFeePolicy, Unit
+from .invoicing import generate_invoices
 
 class CustomUserAdmin(UserAdmin):
     fieldsets = (
@@ -14,4 +16,28 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('username', 'email', 'name')
     list_filter = ('is_staff', 'is_superuser', 'role', 'status')
 
-admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
+class UnitAdmin(admin.ModelAdmin):
+    list_display = ('unit_number', 'building', 'type', 'rent_amount', 'status')
+    list_filter = ('status', 'type', 'building')
+    list_select_related = ('building',)
+    search_fields = ('unit_number',)
+    actions = ['generate_current_invoices']
+
+    @admin.action(description=_("Generate this month's rent invoices for selected units"))
+    def generate_current_invoices(self, request, queryset):
+        today = timezone.localdate()
+        run = generate_invoices(today.year, today.month, units=queryset)
+        self.message_user(
+            request,
+            f"Created {run.created} invoices for {run.month}/{run.year} "
+            f"({run.skipped} already existed) in {run.elapsed:.2f}s.",
+        )
+
+class LateFeePolicyAdmin(admin.ModelAdmin):
+    list_display = ('building', 'due_day', 'grace_days', 'flat_fee', 'daily_rate', 'max_fee')
+    list_select_related = ('building',)
+    search_fields = ('building__name',)
+
+admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(Unit, UnitAdmin)
+admin.site.register(LateFeePolicy, LateFeePolicyAdmin)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import csv
+import io
+from array import array
+from itertools import accumulate
+from operator import sub, truediv
+
+from django.db.models import Count
+
+from . import caching
+from .models import RentLedger, RentPayment, Unit
+
+SERIES = ('rent_roll', 'collected', 'outstanding', 'collection_rate', 'collection_rate_3m', 'occupied_units', 'occupancy_rate')
+TREND_MONTHS = 3
+
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+
+def month_label(index):
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def _in_range(queryset, start, end):
+    # Rows are keyed by (year, month); bound the years in SQL so the period
+    # indexes apply, and trim the partial first/last year while filling arrays.
+    return queryset.filter(year__gte=start // 12, year__lte=end // 12)
+
+
+def _ratio(numerators, denominators):
+    return [round(truediv(n, d), 4) if d else None for n, d in zip(numerators, denominators)]
+
+
+def _trailing(values, months):
+    sums = array('d', [0.0, *accumulate(values)])
+    return array('d', map(sub, sums[months:], sums[:-months])) if len(values) >= months else array('d')
+
+
+def compute(start, end, building=None):
+    """Monthly rent roll, collections and occupancy from `start` to `end`
+    (month indexes, inclusive), for one building or the whole portfolio.
+
+    Each dimension is one aggregate query read into a column array; the
+    series are then element-wise operations over those columns.
+    """
+    size = end - start + 1
+    billed, collected, occupied = array('d', bytes(8 * size)), array('d', bytes(8 * size)), array('l', [0] * size)
+
+    ledger = _in_range(RentLedger.objects.all(), start, end)
+    payments = _in_range(RentPayment.objects.order_by(), start, end)
+    units = Unit.objects.all()
+    if building is not None:
+        ledger, payments, units = ledger.filter(building=building), payments.filter(unit__building=building), units.filter(building=building)
+
+    for year, month, status, total in ledger.values_list('year', 'month', 'status', 'total_amount'):
+        i = month_index(year, month) - start
+        if 0 <= i < size:
+            billed[i] += float(total)
+            if status == 'paid':
+                collected[i] += float(total)
+    for year, month, count in payments.values('year', 'month').annotate(units=Count('unit', distinct=True)).values_list('year', 'month', 'units'):
+        i = month_index(year, month) - start
+        if 0 <= i < size:
+            occupied[i] = count
+    unit_count = units.count()
+
+    # The first months of the trailing rate cover fewer than TREND_MONTHS.
+    billed_3m = array('d', accumulate(billed[:TREND_MONTHS - 1])) + _trailing(billed, TREND_MONTHS)
+    collected_3m = array('d', accumulate(collected[:TREND_MONTHS - 1])) + _trailing(collected, TREND_MONTHS)
+    return {
+        'building': building.pk if building is not None else None,
+        'units': unit_count,
+        'labels': [month_label(index) for index in range(start, end + 1)],
+        'series': {
+            'rent_roll': [round(value, 2) for value in billed],
+            'collected': [round(value, 2) for value in collected],
+            'outstanding': [round(value, 2) for value in map(sub, billed, collected)],
+            'collection_rate': _ratio(collected, billed),
+            'collection_rate_3m': _ratio(collected_3m, billed_3m),
+            'occupied_units': occupied.tolist(),
+            'occupancy_rate': _ratio(occupied, [unit_count] * size),
+        },
+    }
+
+
+def series(start, end, building=None):
+    vary = (building.pk if building is not None else None, start, end)
+    return caching.cached('analytics', (RentLedger, RentPayment, Unit), vary, lambda: compute(start, end, building))
+
+
+def to_csv(data):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['month', *SERIES])
+    columns = [data['series'][name] for name in SERIES]
+    writer.writerows(zip(data['labels'], *(['' if value is None else value for value in column] for column in columns)))
+    return out.getvalue()
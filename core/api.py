@@ -0,0 +1,241 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms import modelform_factory
+from django.forms.models import model_to_dict
+from django.http import JsonResponse
+
+from .models import Building, RentPayment, Tenant, Unit
+from .pagination import cursor_values, decode_cursor, encode_cursor, keyset_q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 500
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def _parse_body(request):
+    try:
+        data = json.loads(request.body or b'null')
+    except ValueError:
+        raise BadRequest("Request body is not valid JSON.")
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not data or not all(isinstance(item, dict) for item in data):
+        raise BadRequest("Send a JSON object or a non-empty array of objects.")
+    if len(data) > MAX_BATCH_SIZE:
+        raise BadRequest(f"At most {MAX_BATCH_SIZE} objects can be sent in one request.")
+    return data
+
+
+class Resource:
+    """JSON endpoints for one model.
+
+    `fields` maps output names to ORM paths; reads use values() over those
+    paths, so related columns come from joins rather than per-row queries.
+    Writes go through a ModelForm and Model.save() per object, in one
+    transaction, so ledger, occupancy and summary bookkeeping stay in one
+    place.
+
+    The API authenticates with the session like the HTML pages, so POST and
+    PATCH need the CSRF token in an X-CSRFToken header.
+    """
+
+    def __init__(self, model, fields, form_fields, filters=None, orderings=None):
+        self.model = model
+        self.fields = fields
+        self.form_class = modelform_factory(model, fields=form_fields)
+        self.filters = filters or {}
+        self.orderings = {'id': ('id',), **(orderings or {})}
+
+    def get_fields(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise BadRequest(f"Unknown fields: {', '.join(unknown)}.")
+        return names
+
+    def get_queryset(self, request):
+        queryset = self.model.objects.all()
+        for param, lookup in self.filters.items():
+            value = request.GET.get(param)
+            if value not in (None, ''):
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def get_ordering(self, request):
+        ordering = request.GET.get('ordering', 'id')
+        if ordering not in self.orderings:
+            raise BadRequest(f"Ordering must be one of: {', '.join(self.orderings)}.")
+        return self.orderings[ordering]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise BadRequest("limit must be an integer.")
+        return max(1, min(size, MAX_PAGE_SIZE))
+
+    async def fetch(self, queryset, names, ordering=()):
+        paths = [self.fields[name] for name in names]
+        paths += [field.lstrip('-') for field in ordering if field.lstrip('-') not in paths]
+        return [row async for row in queryset.values(*paths)]
+
+    def output(self, row, names):
+        return {name: row[self.fields[name]] for name in names}
+
+    async def list_view(self, request):
+        try:
+            if request.method == 'GET':
+                return await self.list(request)
+            if request.method == 'POST':
+                return await self.write(request, self.create_batch, status=201)
+            if request.method == 'PATCH':
+                return await self.write(request, self.update_batch, status=200)
+        except BadRequest as e:
+            return _error(str(e))
+        except (ValueError, ValidationError):
+            return _error("Invalid filter value.")
+        return _error("Method not allowed.", status=405)
+
+    async def detail_view(self, request, pk):
+        if request.method != 'GET':
+            return _error("Method not allowed.", status=405)
+        try:
+            names = self.get_fields(request)
+        except BadRequest as e:
+            return _error(str(e))
+        rows = await self.fetch(self.model.objects.filter(pk=pk), names)
+        if not rows:
+            return _error("Not found.", status=404)
+        return JsonResponse(self.output(rows[0], names))
+
+    async def list(self, request):
+        names = self.get_fields(request)
+        ordering = self.get_ordering(request)
+        page_size = self.get_page_size(request)
+        queryset = self.get_queryset(request).order_by(*ordering)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            values, _ = decode_cursor(cursor)
+            if values is not None:
+                values = cursor_values(self.model, ordering, values)
+            if values is None:
+                raise BadRequest("Invalid cursor.")
+            queryset = queryset.filter(keyset_q(ordering, values))
+        rows = await self.fetch(queryset[:page_size + 1], names, ordering)
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor([rows[-1][field.lstrip('-')] for field in ordering])
+        return JsonResponse({'results': [self.output(row, names) for row in rows], 'next_cursor': next_cursor})
+
+    async def write(self, request, write_batch, status):
+        names = self.get_fields(request)
+        pks, errors = await sync_to_async(write_batch)(_parse_body(request))
+        if errors:
+            return _error("No objects were saved.", errors=errors)
+        rows = {row[self.fields['id']]: row async for row in self.model.objects.filter(pk__in=pks).values(
+            *{self.fields[name] for name in names} | {'id'})}
+        return JsonResponse({'results': [self.output(rows[pk], names) for pk in pks]}, status=status)
+
+    def save_forms(self, forms):
+        pks, errors = [], {}
+        with transaction.atomic():
+            for index, form in enumerate(forms):
+                if isinstance(form, str):
+                    errors[index] = {'id': [{'message': form, 'code': 'invalid'}]}
+                elif form.is_valid():
+                    pks.append(form.save().pk)
+                else:
+                    errors[index] = form.errors.get_json_data()
+            if errors:
+                transaction.set_rollback(True)
+        return pks, errors
+
+    def form_for(self, instance, item):
+        # Start from the instance's values so omitted fields keep their
+        # current value (or the model default when creating).
+        data = model_to_dict(instance, fields=self.form_class._meta.fields)
+        data.update({key: value for key, value in item.items() if key != 'id'})
+        return self.form_class(data, instance=instance)
+
+    def create_batch(self, items):
+        return self.save_forms([self.form_for(self.model(), item) for item in items])
+
+    def update_batch(self, items):
+        ids = [item.get('id') for item in items]
+        if not all(isinstance(pk, int) for pk in ids):
+            raise BadRequest("Every object in an update needs an integer id.")
+        instances = self.model.objects.in_bulk(ids)
+        forms = []
+        for item in items:
+            instance = instances.get(item['id'])
+            if instance is None:
+                forms.append(f"No {self.model._meta.verbose_name} with id {item['id']}.")
+                continue
+            forms.append(self.form_for(instance, item))
+        return self.save_forms(forms)
+
+
+buildings = Resource(
+    Building,
+    fields={'id': 'id', 'name': 'name', 'location': 'location', 'type': 'type', 'description': 'description'},
+    form_fields=['name', 'location', 'type', 'description'],
+    filters={'type': 'type', 'name': 'name__icontains', 'location': 'location__icontains'},
+    orderings={'name': ('name', 'id')},
+)
+
+units = Resource(
+    Unit,
+    fields={
+        'id': 'id', 'building': 'building_id', 'building_name': 'building__name', 'unit_number': 'unit_number',
+        'type': 'type', 'rent_amount': 'rent_amount', 'status': 'status',
+    },
+    form_fields=['building', 'unit_number', 'type', 'rent_amount'],
+    filters={
+        'building': 'building_id', 'status': 'status', 'type': 'type',
+        'min_rent': 'rent_amount__gte', 'max_rent': 'rent_amount__lte',
+    },
+    orderings={'unit_number': ('unit_number',), 'rent_amount': ('rent_amount', 'id')},
+)
+
+tenants = Resource(
+    Tenant,
+    fields={
+        'id': 'id', 'name': 'name', 'phone': 'phone', 'email': 'email', 'id_number': 'id_number',
+        'status': 'status', 'unit': 'unit_id', 'unit_number': 'unit__unit_number',
+        'building': 'unit__building_id', 'user': 'user_id',
+    },
+    form_fields=['name', 'phone', 'email', 'id_number', 'status', 'unit', 'user'],
+    filters={'building': 'unit__building_id', 'unit': 'unit_id', 'status': 'status', 'name': 'name__icontains'},
+    orderings={'name': ('name', 'id')},
+)
+
+payments = Resource(
+    RentPayment,
+    fields={
+        'id': 'id', 'tenant': 'tenant_id', 'tenant_name': 'tenant__name', 'unit': 'unit_id',
+        'unit_number': 'unit__unit_number', 'building': 'unit__building_id', 'amount': 'amount',
+        'year': 'year', 'month': 'month', 'status': 'status', 'payment_date': 'payment_date',
+        'receipt_number': 'receipt_number',
+    },
+    form_fields=['tenant', 'unit', 'amount', 'year', 'month', 'status', 'payment_date'],
+    filters={
+        'tenant': 'tenant_id', 'unit': 'unit_id', 'building': 'unit__building_id',
+        'status': 'status', 'year': 'year', 'month': 'month',
+    },
+    orderings={'period': ('year', 'month', 'id'), '-period': ('-year', '-month', '-id')},
+)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals, staticfiles  # noqa: F401
+        if settings.TEMPLATE_PRECOMPILE:
+            from .templating import precompile
+            precompile()
@@ -0,0 +1,136 @@
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DateField, DecimalField, F, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+
+from . import caching
+from .models import ArrearsEntry, LateFeePolicy, RentPayment, Tenant
+
+POLICY = 'unit__building__late_fee_policy__'
+DEFAULTS = {
+    name: LateFeePolicy._meta.get_field(name).default
+    for name in ('due_day', 'grace_days', 'flat_fee', 'daily_rate')
+}
+COLUMNS = ('as_of', 'payment_id', 'tenant_id', 'building_id', 'amount', 'due_date', 'days_overdue', 'late_fee')
+
+
+@dataclass
+class ArrearsRun:
+    as_of: date
+    entries: int = 0
+    amount: Decimal = Decimal('0')
+    late_fees: Decimal = Decimal('0')
+    elapsed: float = 0.0
+
+
+def owed_on(as_of):
+    # Payments settled after `as_of` were still owed on that day, so past
+    # dates can be evaluated as well as today.
+    return RentPayment.objects.filter(Q(status='unpaid') | Q(payment_date__gt=as_of))
+
+
+def _policy(name):
+    money = DecimalField(max_digits=10, decimal_places=2)
+    field = money if name in ('flat_fee', 'daily_rate') else IntegerField()
+    return Coalesce(F(POLICY + name), Value(DEFAULTS[name], output_field=field), output_field=field)
+
+
+def _period_rows(as_of, year, month, due_days):
+    """SELECT producing the arrears columns for one rent period.
+
+    Everything that depends on the calendar is a constant for the period, so
+    the per-row work is integer and decimal arithmetic every backend can do.
+    """
+    start = date(year, month, 1)
+    money = DecimalField(max_digits=10, decimal_places=2)
+    rows = (
+        owed_on(as_of).filter(year=year, month=month)
+        .order_by()
+        .alias(days_overdue=Value((as_of - start).days + 1) - _policy('due_day'))
+        .alias(past_grace=F('days_overdue') - _policy('grace_days'))
+        .alias(raw_fee=Case(
+            When(past_grace__gt=0, then=_policy('flat_fee') + F('amount') * _policy('daily_rate') / 100 * F('past_grace')),
+            default=Value(0),
+            output_field=money,
+        ))
+        .filter(days_overdue__gt=0)
+    )
+    return rows.values_list(
+        Value(as_of, output_field=DateField()),
+        'id',
+        'tenant_id',
+        'unit__building_id',
+        'amount',
+        Case(
+            *[When(**{POLICY + 'due_day': day}, then=Value(start.replace(day=day))) for day in due_days],
+            default=Value(start.replace(day=DEFAULTS['due_day'])),
+            output_field=DateField(),
+        ),
+        F('days_overdue'),
+        Round(Case(
+            When(**{POLICY + 'max_fee__lt': F('raw_fee')}, then=F(POLICY + 'max_fee')),
+            default=F('raw_fee'),
+            output_field=money,
+        ), 2, output_field=money),
+    )
+
+
+@transaction.atomic
+def evaluate(as_of):
+    """Write the arrears snapshot for `as_of`, replacing any earlier one."""
+    run = ArrearsRun(as_of=as_of)
+    started = time.perf_counter()
+    ArrearsEntry.objects.filter(as_of=as_of).delete()
+
+    due_days = sorted(set(LateFeePolicy.objects.values_list('due_day', flat=True)) - {DEFAULTS['due_day']})
+    periods = (
+        owed_on(as_of).filter(Q(year__lt=as_of.year) | Q(year=as_of.year, month__lte=as_of.month))
+        .order_by('year', 'month').values_list('year', 'month').distinct()
+    )
+    table = connection.ops.quote_name(ArrearsEntry._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in COLUMNS)
+    with connection.cursor() as cursor:
+        for year, month in periods:
+            sql, params = _period_rows(as_of, year, month, due_days).query.sql_with_params()
+            cursor.execute(f'INSERT INTO {table} ({columns}) {sql}', params)
+
+    totals = ArrearsEntry.objects.filter(as_of=as_of).aggregate(
+        entries=Count('id'), amount=Sum('amount', default=0), late_fees=Sum('late_fee', default=0),
+    )
+    run.entries, run.amount, run.late_fees = totals['entries'], totals['amount'], totals['late_fees']
+    caching.bump(ArrearsEntry)
+    run.elapsed = time.perf_counter() - started
+    return run
+
+
+def prune(keep_days, today):
+    deleted, _ = ArrearsEntry.objects.filter(as_of__lt=today - timedelta(days=keep_days)).delete()
+    return deleted
+
+
+def tenants_owing(as_of, building=None):
+    """Tenants with arrears on `as_of`, annotated with their totals."""
+    entries = Q(arrears__as_of=as_of)
+    if building is not None:
+        entries &= Q(arrears__building=building)
+    return Tenant.objects.filter(entries).annotate(
+        owed=Sum('arrears__amount'),
+        late_fees=Sum('arrears__late_fee'),
+        periods=Count('arrears'),
+        days_overdue=Max('arrears__days_overdue'),
+    )
+
+
+def totals(as_of, building=None):
+    entries = ArrearsEntry.objects.filter(as_of=as_of)
+    if building is not None:
+        entries = entries.filter(building=building)
+    return entries.aggregate(
+        tenants=Count('tenant', distinct=True),
+        owed=Sum('amount', default=0),
+        late_fees=Sum('late_fee', default=0),
+    )
@@ -0,0 +1,177 @@
+import atexit
+import contextvars
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import FileField
+from django.utils import timezone
+
+from .models import AuditEntry, Building, CustomUser, LateFeePolicy, RentPayment, Tenant, Unit
+
+logger = logging.getLogger(__name__)
+
+MODELS = (CustomUser, Building, Unit, Tenant, RentPayment, LateFeePolicy)
+IGNORED_FIELDS = {'last_login'}
+MASKED_FIELDS = {'password'}
+
+# The request, not request.user: the user is resolved only when an entry is
+# written, which is always sync code, so async views never evaluate it.
+current_request = contextvars.ContextVar('audit_request', default=None)
+
+
+def _value(field, value):
+    if isinstance(field, FileField):
+        return str(value or '')
+    return field.to_python(value)
+
+
+def _fields(instance):
+    return [field for field in instance._meta.concrete_fields if field.attname not in IGNORED_FIELDS]
+
+
+def snapshot(instance):
+    return {field.attname: _value(field, getattr(instance, field.attname)) for field in _fields(instance)}
+
+
+def _masked(values):
+    return {name: '***' if name in MASKED_FIELDS else value for name, value in values.items()}
+
+
+def diff(instance, update_fields=None):
+    """Changed columns as {attname: [old, new]}, or None if nothing changed."""
+    changes = {}
+    for field in _fields(instance):
+        name = field.attname
+        if name not in instance._audit_state or (update_fields is not None and field.name not in update_fields):
+            continue
+        old, new = _value(field, instance._audit_state[name]), _value(field, getattr(instance, name))
+        if old != new:
+            changes[name] = ['***', '***'] if name in MASKED_FIELDS else [old, new]
+    return changes or None
+
+
+class AuditLog:
+    """Buffers entries in memory and writes them with bulk_create from a
+    background thread, every `interval` seconds or once `batch_size` pile up.
+    """
+
+    def __init__(self, batch_size=200, interval=1.0):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.buffer = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def append(self, entry):
+        if getattr(settings, 'BACKGROUND_TASKS_INLINE', False):
+            AuditEntry.objects.bulk_create([entry])
+            return
+        self.buffer.append(entry)
+        self._start()
+        if len(self.buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='core-audit', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+            close_old_connections()
+
+    def flush(self):
+        with self._flush_lock:
+            while self.buffer:
+                entries = []
+                while self.buffer and len(entries) < self.batch_size:
+                    entries.append(self.buffer.popleft())
+                self._write(entries)
+
+    def _write(self, entries):
+        try:
+            AuditEntry.objects.bulk_create(entries)
+        except Exception:
+            logger.exception("Dropped %d audit entries", len(entries))
+
+
+log = AuditLog(
+    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 200),
+    interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+)
+
+
+_suspensions = 0
+_suspensions_lock = threading.Lock()
+
+
+@contextmanager
+def suspended():
+    """Record nothing while the block runs, in any thread of this process.
+
+    For load tests and benchmarks whose throwaway rows would otherwise
+    stay in the append-only log.
+    """
+    global _suspensions
+    with _suspensions_lock:
+        _suspensions += 1
+    try:
+        yield
+    finally:
+        with _suspensions_lock:
+            _suspensions -= 1
+
+
+def _user_id():
+    user = getattr(current_request.get(), 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def record(instance, action, changes):
+    if _suspensions:
+        return
+    entry = AuditEntry(
+        timestamp=timezone.now(), model=instance._meta.model_name, object_id=instance.pk,
+        action=action, user_id=_user_id(), changes=changes,
+    )
+    # Only changes that commit are logged; the write itself happens later.
+    transaction.on_commit(partial(log.append, entry))
+
+
+def saved(instance, created, update_fields=None):
+    if created:
+        record(instance, 'create', _masked(snapshot(instance)))
+    elif instance._audit_state is None:
+        # Saved without being loaded first, so the old values are unknown.
+        record(instance, 'update', {name: [None, value] for name, value in _masked(snapshot(instance)).items()})
+    elif changes := diff(instance, update_fields):
+        record(instance, 'update', changes)
+    instance._audit_state = snapshot(instance)
+
+
+def deleted(instance):
+    record(instance, 'delete', _masked(snapshot(instance)))
+
+
+def history(model, object_id=None, since=None, until=None):
+    """Entries for one model (and optionally one object) in a time range."""
+    entries = AuditEntry.objects.filter(model=model)
+    if object_id is not None:
+        entries = entries.filter(object_id=object_id)
+    if since is not None:
+        entries = entries.filter(timestamp__gte=since)
+    if until is not None:
+        entries = entries.filter(timestamp__lt=until)
+    return entries
@@ -1,19 +1,44 @@
 # apartment_management/core/backends.py
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Case, Q, Value, When
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
 
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(email=username)
-            if user.check_password(password):
-                return user
-        except UserModel.DoesNotExist:
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        # One indexed lookup for either identifier, preferring an email match.
+        user = (
+            UserModel._default_manager.filter(Q(email=username) | Q(username=username))
+            .order_by(Case(When(email=username, then=Value(0)), default=Value(1)))
+            .first()
+        )
+        if user is None:
+            # Run the hasher anyway so unknown accounts take as long as bad passwords.
+            UserModel().set_password(password)
             return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
     def get_user(self, user_id):
-        UserModel = get_user_model()
-        try:
-            return UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return None
\ No newline at end of file
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
\ No newline at end of file
@@ -0,0 +1,260 @@
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+
+from .models import Building, RentPayment, Tenant, Unit
+from .seeding import seed
+from .urls import PUBLIC, route_roles, urlpatterns
+
+# Differences below these floors are treated as noise, whatever the ratio.
+MIN_SECONDS_DELTA = 0.002
+MIN_PEAK_KIB_DELTA = 64
+
+
+@dataclass
+class Measurement:
+    seconds: float
+    queries: int
+    peak_kib: float
+
+
+def count_queries(fn):
+    """Queries run by fn().
+
+    Counted as they execute: every request resets connection.queries_log, so
+    CaptureQueriesContext undercounts anything that goes through the client.
+    """
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        fn()
+    return count
+
+
+def _prepare(setup):
+    # Start every run cold, so cached pages are measured building their fragments.
+    cache.clear()
+    if setup is not None:
+        setup()
+
+
+def _rolled_back(fn, setup=None):
+    with transaction.atomic():
+        _prepare(setup)
+        fn()
+        transaction.set_rollback(True)
+
+
+def measure(fn, setup=None, repeat=5):
+    """Median wall time over `repeat` runs, plus queries and peak memory of one run.
+
+    Every run starts with an empty cache and is rolled back, so each one
+    measures the same work.
+    """
+    _rolled_back(fn, setup)  # warm caches, template loaders and imports
+    with transaction.atomic():
+        _prepare(setup)
+        query_count = count_queries(fn)
+        transaction.set_rollback(True)
+
+    timings = []
+    for _ in range(repeat):
+        with transaction.atomic():
+            _prepare(setup)
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+
+    tracemalloc.start()
+    try:
+        _rolled_back(fn, setup)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Measurement(statistics.median(timings), query_count, peak / 1024)
+
+
+def _fetch(client, url, method='get', **request):
+    response = getattr(client, method)(url, **request)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    response.close()
+    if not 200 <= response.status_code < 400:
+        raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+
+
+# Routes whose pk is not the object named by the route's first word.
+ROUTE_OBJECTS = {'tenant_payment_receipt': 'rent'}
+
+
+def route_kwargs(pattern, objects):
+    """URL arguments for `pattern`, or None if some converter can't be filled."""
+    samples = {'fmt': 'csv', 'source': 'units'}
+    kind = ROUTE_OBJECTS.get(pattern.name, pattern.name.split('_')[0])
+    kwargs = {}
+    for name in pattern.pattern.converters:
+        if name == 'pk' and kind in objects:
+            kwargs[name] = objects[kind].pk
+        elif name in samples:
+            kwargs[name] = samples[name]
+        else:
+            return None
+    return kwargs
+
+
+def route_requests(objects):
+    """Requests for routes a bare GET would only answer with an error."""
+    return {
+        'audit_log_api': {'data': {'model': 'rentpayment', 'object_id': objects['rent'].pk}},
+        'rent_payment_mark_paid': {'method': 'post', 'data': {'payments': [objects['unpaid'].pk]}},
+        'tenant_api_move': {
+            'method': 'post', 'content_type': 'application/json',
+            'data': {'moves': [{'tenant': objects['unpaid'].tenant_id, 'unit': objects['vacant'].pk}]},
+        },
+    }
+
+
+def route_benchmarks(today, skipped=None):
+    """Benchmarks for every route; names of routes that can't be reversed
+    with sample arguments are appended to `skipped` instead.
+    """
+    User = get_user_model()
+    users = {
+        role: User.objects.create_user(
+            username=f'bench-{role}', email=f'bench-{role}@example.com', password='bench', name='Bench', role=role,
+        )
+        for role in ('admin', 'tenant')
+    }
+    payment = (
+        RentPayment.objects.filter(status='paid', year=today.year)
+        .select_related('tenant', 'unit__building')
+        .order_by('id').first()
+    )
+    # The tenant account owns the payment, so tenant routes serve real data.
+    payment.tenant.user = users['tenant']
+    payment.tenant.save(update_fields=['user'])
+    objects = {'building': payment.unit.building, 'unit': payment.unit, 'tenant': payment.tenant, 'rent': payment}
+    objects['unpaid'] = RentPayment.objects.filter(status='unpaid').order_by('id').first()
+    objects['vacant'] = Unit.objects.filter(status='vacant').order_by('id').first()
+    requests = route_requests(objects)
+
+    benchmarks = {}
+    for pattern in urlpatterns:
+        kwargs = route_kwargs(pattern, objects)
+        try:
+            url = reverse(pattern.name, kwargs=kwargs) if kwargs is not None else None
+        except NoReverseMatch:
+            url = None
+        if url is None:
+            if skipped is not None:
+                skipped.append(f'route:{pattern.name}')
+            continue
+        roles = route_roles[pattern.name]
+        client = Client()
+        setup = None
+        if roles is not PUBLIC:
+            user = users['admin' if 'admin' in roles else roles[0]]
+            if pattern.name == 'logout':
+                setup = partial(client.force_login, user)
+            else:
+                client.force_login(user)
+        fetch = partial(_fetch, client, url, **requests.get(pattern.name, {}))
+        benchmarks[f'route:{pattern.name}'] = (fetch, setup)
+    return benchmarks
+
+
+def save_benchmarks(today):
+    payment = RentPayment.objects.filter(status='unpaid').select_related('tenant', 'unit').order_by('id').first()
+    tenant = payment.tenant
+    vacant = Unit.objects.filter(status='vacant').order_by('id').first()
+
+    def create_building():
+        Building.objects.create(name='Bench', location='Nairobi', type='apartment')
+
+    def create_unit():
+        Unit.objects.create(building_id=vacant.building_id, unit_number='bench-unit', type='studio', rent_amount=1000)
+
+    def create_tenant():
+        Tenant.objects.create(name='Bench', phone='0700000000', email='bench@example.com', id_number='bench',
+                              unit=vacant)
+
+    def move_tenant():
+        moving = Tenant.objects.get(pk=tenant.pk)
+        moving.unit = vacant
+        moving.save()
+
+    def create_payment():
+        RentPayment.objects.create(tenant=tenant, unit=tenant.unit, amount=1000, year=1999, month=1)
+
+    def mark_paid():
+        paying = RentPayment.objects.select_related('tenant', 'unit').get(pk=payment.pk)
+        paying.status = 'paid'
+        paying.payment_date = today
+        paying.save()
+
+    return {
+        'save:Building.create': (create_building, None),
+        'save:Unit.create': (create_unit, None),
+        'save:Tenant.create': (create_tenant, None),
+        'save:Tenant.move': (move_tenant, None),
+        'save:RentPayment.create': (create_payment, None),
+        'save:RentPayment.mark_paid': (mark_paid, None),
+    }
+
+
+def run(scale, repeat=5, today=None, only=None, skipped=None):
+    """Seed a portfolio at `scale` (keyword arguments for seed()) and measure every benchmark."""
+    today = today or date.today()
+    seed(today=today, **scale)
+    benchmarks = {**route_benchmarks(today, skipped), **save_benchmarks(today)}
+    return {
+        name: measure(fn, setup, repeat)
+        for name, (fn, setup) in benchmarks.items()
+        if only is None or any(part in name for part in only)
+    }
+
+
+def dump(path, scale, results):
+    with open(path, 'w') as f:
+        json.dump({'scale': scale, 'results': {name: asdict(m) for name, m in results.items()}}, f, indent=2,
+                  sort_keys=True)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data['scale'], {name: Measurement(**values) for name, values in data['results'].items()}
+
+
+def regressions(baseline, results, threshold=0.25):
+    problems = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current.queries > previous.queries:
+            problems.append(f"{name}: {previous.queries} -> {current.queries} queries")
+        if (current.seconds > previous.seconds * (1 + threshold)
+                and current.seconds - previous.seconds > MIN_SECONDS_DELTA):
+            problems.append(f"{name}: {previous.seconds * 1000:.1f} -> {current.seconds * 1000:.1f} ms")
+        if (current.peak_kib > previous.peak_kib * (1 + threshold)
+                and current.peak_kib - previous.peak_kib > MIN_PEAK_KIB_DELTA):
+            problems.append(f"{name}: {previous.peak_kib:.0f} -> {current.peak_kib:.0f} KiB peak memory")
+    return problems
@@ -0,0 +1,147 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+_lock = threading.Lock()
+stats = {'hit': Counter(), 'miss': Counter()}
+
+
+def _version_key(label):
+    return f'core:data-version:{label}'
+
+
+def _touch(label):
+    cache.set(_version_key(label), time.time_ns(), None)
+
+
+def bump(*models):
+    """Invalidate every fragment built from `models`.
+
+    The version moves now and again after commit, so a page rendered from
+    the pre-commit state in the meantime is never stored under the new one.
+    """
+    for model in models:
+        label = model._meta.label_lower
+        _touch(label)
+        transaction.on_commit(partial(_touch, label))
+
+
+def versions(models):
+    keys = [_version_key(model._meta.label_lower) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _count(outcome, name):
+    with _lock:
+        stats[outcome][name] += 1
+
+
+def cached(name, models, vary, build):
+    """Return the value cached as `name` for the current `models` versions, calling build() on a miss."""
+    digest = hashlib.md5(repr((versions(models), vary)).encode()).hexdigest()
+    key = f'core:fragment:{name}:{digest}'
+    value = cache.get(key)
+    if value is None:
+        _count('miss', name)
+        value = build()
+        cache.set(key, value, settings.FRAGMENT_CACHE_TIMEOUT)
+    else:
+        _count('hit', name)
+    return value
+
+
+def render_fragment(name, models, vary, build):
+    return cached(name, models, vary, lambda: str(build()))
+
+
+def _has_messages(request):
+    # Pending flash messages must reach the browser, so never answer 304.
+    return bool(len(messages.get_messages(request)))
+
+
+def etag(request, name, models):
+    if _has_messages(request):
+        return None
+    user = request.user
+    data = (
+        name, versions(models), request.get_full_path(), timezone.localdate(),
+        user.pk, user.get_username(), user.name,
+    )
+    return hashlib.md5(repr(data).encode()).hexdigest()
+
+
+def last_modified(request, models):
+    if _has_messages(request):
+        return None
+    return datetime.fromtimestamp(max(versions(models)) / 1e9, tz=dt_timezone.utc)
+
+
+def conditional(name, models):
+    """Decorator answering If-None-Match / If-Modified-Since from cached versions alone."""
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: etag(request, name, models),
+            last_modified_func=lambda request, *args, **kwargs: last_modified(request, models),
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Revalidate on every load instead of reusing the page heuristically.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+class CachedFragmentMixin:
+    """Cache the data part of a list page, keyed on model versions and the query string.
+
+    The page template receives the rendered fragment as `fragment`; the
+    fragment template receives the usual ListView context.
+    """
+    fragment_name = None
+    fragment_models = ()
+    fragment_template_name = None
+
+    def get(self, request, *args, **kwargs):
+        return conditional(self.fragment_name, self.fragment_models)(self.get_page)(request, *args, **kwargs)
+
+    def get_page(self, request, *args, **kwargs):
+        def build():
+            self.object_list = self.get_queryset()
+            return render_to_string(self.fragment_template_name, self.get_context_data(), request)
+
+        fragment = render_fragment(self.fragment_name, self.fragment_models, request.get_full_path(), build)
+        return render(request, self.template_name, {'fragment': mark_safe(fragment)})
+
+
+def export_stats():
+    lines = [
+        '# HELP core_fragment_cache_requests_total Fragment cache lookups by outcome.',
+        '# TYPE core_fragment_cache_requests_total counter',
+    ]
+    with _lock:
+        for outcome, counter in stats.items():
+            for name, count in sorted(counter.items()):
+                lines.append(f'core_fragment_cache_requests_total{{fragment="{name}",outcome="{outcome}"}} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,85 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .forms import RentPaymentFilterForm, TenantFilterForm, UnitFilterForm
+from .models import RentPayment, Tenant, Unit
+
+EXPORTS = {
+    'payments': (RentPayment, RentPaymentFilterForm, (
+        ('id', 'id'),
+        ('tenant', 'tenant__name'),
+        ('tenant_id_number', 'tenant__id_number'),
+        ('unit', 'unit__unit_number'),
+        ('building', 'unit__building__name'),
+        ('amount', 'amount'),
+        ('year', 'year'),
+        ('month', 'month'),
+        ('status', 'status'),
+        ('payment_date', 'payment_date'),
+        ('receipt_number', 'receipt_number'),
+    )),
+    'tenants': (Tenant, TenantFilterForm, (
+        ('id', 'id'),
+        ('name', 'name'),
+        ('phone', 'phone'),
+        ('email', 'email'),
+        ('id_number', 'id_number'),
+        ('status', 'status'),
+        ('unit', 'unit__unit_number'),
+        ('building', 'unit__building__name'),
+    )),
+    'units': (Unit, UnitFilterForm, (
+        ('id', 'id'),
+        ('unit_number', 'unit_number'),
+        ('building', 'building__name'),
+        ('location', 'building__location'),
+        ('type', 'type'),
+        ('rent_amount', 'rent_amount'),
+        ('status', 'status'),
+    )),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(kind, params, chunk_size=2000):
+    model, filter_form_class, columns = EXPORTS[kind]
+    form = filter_form_class(params or None)
+    queryset = form.filter(model.objects.all()).order_by(*form.get_ordering())
+    return [name for name, _ in columns], queryset.values_list(*(path for _, path in columns)).iterator(chunk_size=chunk_size)
+
+
+def _buffered(lines, size=500):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    yield from _buffered(writer.writerow(row) for row in rows)
+
+
+def stream_jsonl(header, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    yield from _buffered(encoder.encode(dict(zip(header, row))) + '\n' for row in rows)
+
+
+def stream_export(kind, fmt, params):
+    header, rows = export_rows(kind, params)
+    return stream_csv(header, rows) if fmt == 'csv' else stream_jsonl(header, rows)
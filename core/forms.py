@@ -1,5 +1,9 @@
 from django import forms
+from django.db.models import Q
+from django.utils import timezone
 from .models import Building, Unit, Tenant, RentPayment
+from .audit import MODELS as AUDITED_MODELS
+from .lookups import AutocompleteSelect
 
 class BuildingForm(forms.ModelForm):
     class Meta:
@@ -12,26 +16,36 @@ class BuildingForm(forms.ModelForm):
 class UnitForm(forms.ModelForm):
     class Meta:
         model = Unit
-        fields = ['building', 'unit_number', 'type', 'rent_amount', 'status']
+        # status is derived from tenant assignments by core.occupancy.
+        fields = ['building', 'unit_number', 'type', 'rent_amount']
         widgets = {
-            'building': forms.Select(),
+            'building': AutocompleteSelect('buildings'),
             'rent_amount': forms.NumberInput(attrs={'step': '0.0'}),
         }
 
-class TenantForm(forms.ModelForm):
+class VacantUnitMixin:
+    # Only vacant units (or the tenant's current one) can be picked.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['unit'].queryset = Unit.objects.select_related('building').filter(
+            Q(status='vacant') | Q(pk=self.instance.unit_id),
+        )
+
+class TenantForm(VacantUnitMixin, forms.ModelForm):
     class Meta:
         model = Tenant
-        fields = ['name', 'phone', 'email', 'email', 'id_number', 'profile_photo', 'status', 'unit']
+        fields = ['name', 'phone', 'email', 'email', 'id_number', 'profile_photo', 'status', 'unit', 'user']
         widgets = {
-            'unit': forms.Select(),
+            'unit': AutocompleteSelect('vacant-units'),
+            'user': AutocompleteSelect('tenant-accounts'),
         }
 
-class TenantAssignForm(forms.ModelForm):
+class TenantAssignForm(VacantUnitMixin, forms.ModelForm):
     class Meta:
         model = Tenant
         fields = ['unit']
         widgets = {
-            'unit': forms.Select(),
+            'unit': AutocompleteSelect('vacant-units'),
         }
 
 class RentPaymentForm(forms.ModelForm):
@@ -39,8 +53,161 @@ class RentPaymentForm(forms.ModelForm):
         model = RentPayment
         fields = ['tenant', 'unit', 'amount', 'year', 'month', 'status', 'payment_date']
         widgets = {
-            'tenant': forms.Select(),
-            'unit': forms.Select(),
+            'tenant': AutocompleteSelect('tenants'),
+            'unit': AutocompleteSelect('units'),
             'payment_date': forms.DateInput(attrs={'type': 'date'}),
             'month': forms.Select(),
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['unit'].queryset = Unit.objects.select_related('building')
+
+class ListFilterForm(forms.Form):
+    orderings = {}
+    default_sort = None
+
+    def get_data(self):
+        if not self.is_bound:
+            return {}
+        self.is_valid()
+        return self.cleaned_data
+
+    def get_ordering(self):
+        return self.orderings[self.get_data().get('sort') or self.default_sort]
+
+    def filter(self, queryset):
+        data = self.get_data()
+        lookups = {lookup: data[name] for name, lookup in self.lookups.items() if data.get(name) not in (None, '')}
+        return queryset.filter(**lookups)
+
+class UnitFilterForm(ListFilterForm):
+    SORT_CHOICES = (
+        ('unit_number', 'Unit number (A-Z)'),
+        ('-unit_number', 'Unit number (Z-A)'),
+        ('rent_amount', 'Rent (low to high)'),
+        ('-rent_amount', 'Rent (high to low)'),
+    )
+    orderings = {
+        'unit_number': ('unit_number',),
+        '-unit_number': ('-unit_number',),
+        'rent_amount': ('rent_amount', 'id'),
+        '-rent_amount': ('-rent_amount', '-id'),
+    }
+    default_sort = 'unit_number'
+    lookups = {'building': 'building', 'status': 'status'}
+
+    building = forms.ModelChoiceField(queryset=Building.objects.order_by('name'), required=False, empty_label='All buildings')
+    status = forms.ChoiceField(choices=(('', 'All statuses'),) + Unit.STATUS_CHOICES, required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+class TenantFilterForm(ListFilterForm):
+    SORT_CHOICES = (
+        ('name', 'Name (A-Z)'),
+        ('-name', 'Name (Z-A)'),
+    )
+    orderings = {
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+    }
+    default_sort = 'name'
+    lookups = {'building': 'unit__building', 'status': 'status'}
+
+    building = forms.ModelChoiceField(queryset=Building.objects.order_by('name'), required=False, empty_label='All buildings')
+    status = forms.ChoiceField(choices=(('', 'All statuses'),) + Tenant.STATUS_CHOICES, required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+class RentPaymentFilterForm(ListFilterForm):
+    SORT_CHOICES = (
+        ('-period', 'Newest period first'),
+        ('period', 'Oldest period first'),
+    )
+    orderings = {
+        '-period': ('-year', '-month', '-id'),
+        'period': ('year', 'month', 'id'),
+    }
+    default_sort = '-period'
+    lookups = {'building': 'unit__building', 'status': 'status', 'year': 'year', 'month': 'month'}
+
+    building = forms.ModelChoiceField(queryset=Building.objects.order_by('name'), required=False, empty_label='All buildings')
+    status = forms.ChoiceField(choices=(('', 'All statuses'),) + RentPayment.STATUS_CHOICES, required=False)
+    year = forms.IntegerField(required=False, min_value=1900, max_value=9999)
+    month = forms.TypedChoiceField(choices=[('', 'Any month')] + [(i, i) for i in range(1, 13)], coerce=int, required=False, empty_value=None)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+class VacancySearchForm(forms.Form):
+    q = forms.CharField(required=False, label='Building or location')
+    type = forms.ChoiceField(choices=(('', 'Any type'),) + Unit.TYPE_CHOICES, required=False)
+    status = forms.ChoiceField(choices=(('', 'Any status'),) + Unit.STATUS_CHOICES, required=False, initial='vacant')
+    min_rent = forms.DecimalField(required=False, min_value=0, label='Min rent')
+    max_rent = forms.DecimalField(required=False, min_value=0, label='Max rent')
+    building = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def get_data(self):
+        if not self.is_bound or not self.is_valid():
+            return {'status': 'vacant'}
+        return self.cleaned_data
+
+class ArrearsForm(forms.Form):
+    as_of = forms.DateField(required=False, label='As of', widget=forms.DateInput(attrs={'type': 'date'}))
+    building = forms.ModelChoiceField(queryset=Building.objects.order_by('name'), required=False, empty_label='All buildings')
+
+    def get_data(self, today):
+        data = self.cleaned_data if self.is_bound and self.is_valid() else {}
+        return data.get('as_of') or today, data.get('building')
+
+class MarkPaidForm(forms.Form):
+    payments = forms.ModelMultipleChoiceField(queryset=RentPayment.objects.filter(status='unpaid'))
+    payment_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+class ReconcileForm(forms.Form):
+    file = forms.FileField(help_text="Bank statement as CSV or XLSX with date, amount, reference and optional period columns.")
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return upload
+
+class AnalyticsForm(forms.Form):
+    MAX_MONTHS = 240
+
+    building = forms.ModelChoiceField(queryset=Building.objects.order_by('name'), required=False, empty_label='All buildings')
+    start = forms.DateField(required=False, input_formats=['%Y-%m'], widget=forms.DateInput(attrs={'type': 'month'}))
+    end = forms.DateField(required=False, input_formats=['%Y-%m'], widget=forms.DateInput(attrs={'type': 'month'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Months are counted as year * 12 + month - 1; the default range is
+        # the last twelve months.
+        end = cleaned_data.get('end') or timezone.localdate()
+        end = end.year * 12 + end.month - 1
+        start = cleaned_data.get('start')
+        start = start.year * 12 + start.month - 1 if start else end - 11
+        if start > end:
+            raise forms.ValidationError("The start month must not be after the end month.")
+        if end - start >= self.MAX_MONTHS:
+            raise forms.ValidationError(f"Choose at most {self.MAX_MONTHS} months.")
+        cleaned_data['months'] = start, end
+        return cleaned_data
+
+class AuditQueryForm(forms.Form):
+    model = forms.ChoiceField(choices=[(model._meta.model_name, model._meta.verbose_name) for model in AUDITED_MODELS])
+    object_id = forms.IntegerField(required=False)
+    since = forms.DateTimeField(required=False)
+    until = forms.DateTimeField(required=False)
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = (
+        ('buildings', 'Buildings'),
+        ('units', 'Units'),
+        ('tenants', 'Tenants'),
+    )
+    kind = forms.ChoiceField(choices=KIND_CHOICES)
+    file = forms.FileField(help_text="CSV or XLSX file with a header row.")
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return upload
@@ -0,0 +1,267 @@
+import csv
+import io
+import time
+import zipfile
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import caching
+from .models import Building, Tenant, Unit
+from .occupancy import sync_units
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def _normalize_header(header):
+    return [str(name).strip().lower() if name is not None else '' for name in header]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_csv(fileobj):
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    header = _normalize_header(next(reader, []))
+    for values in reader:
+        if any(values):
+            yield reader.line_num, dict(zip(header, (_cell(value) for value in values)))
+
+
+def read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Reading .xlsx files requires the openpyxl package.")
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ValueError("The file is not a valid .xlsx workbook.")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        for line, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield line, dict(zip(header, (_cell(value) for value in values)))
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(fileobj)
+    return read_csv(fileobj)
+
+
+def _error_text(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f"{name}: {' '.join(messages)}" for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+class BaseImporter:
+    model = None
+    exclude = ()
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.result = ImportResult()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self.result.rows += len(batch)
+            self.import_batch(batch)
+        if self.result.created:
+            caching.bump(self.model)
+        self.result.elapsed = time.perf_counter() - started
+        return self.result
+
+    def import_batch(self, batch):
+        self.prefetch([row for _, row in batch])
+        accepted = []
+        for line, row in batch:
+            try:
+                obj = self.build(row)
+                obj.clean_fields(exclude=self.exclude)
+            except ValidationError as e:
+                self.result.errors.append((line, _error_text(e)))
+            else:
+                self.accept(obj)
+                accepted.append((line, obj))
+        if not accepted:
+            return
+        try:
+            self.insert([obj for _, obj in accepted])
+        except IntegrityError:
+            # Something the prefetched sets didn't know about, such as a row
+            # written concurrently; insert one at a time to find the culprits.
+            for line, obj in accepted:
+                obj.pk = None
+                try:
+                    self.insert([obj])
+                except IntegrityError as e:
+                    self.forget(obj)
+                    self.result.errors.append((line, f"Not imported: {e}"))
+
+    def insert(self, objs):
+        with transaction.atomic():
+            self.model.objects.bulk_create(objs)
+            self.after_insert(objs)
+        self.result.created += len(objs)
+
+    def prefetch(self, rows):
+        pass
+
+    def build(self, row):
+        raise NotImplementedError
+
+    def accept(self, obj):
+        pass
+
+    def forget(self, obj):
+        pass
+
+    def after_insert(self, objs):
+        pass
+
+
+class BuildingImporter(BaseImporter):
+    model = Building
+
+    def build(self, row):
+        return Building(
+            name=row.get('name', ''),
+            location=row.get('location', ''),
+            type=row.get('type', '').lower(),
+            description=row.get('description', ''),
+        )
+
+
+class UnitImporter(BaseImporter):
+    model = Unit
+    exclude = ('building',)
+
+    def __init__(self, batch_size=1000):
+        super().__init__(batch_size)
+        self.buildings = {}
+        self.unit_numbers = set()
+
+    def prefetch(self, rows):
+        names = {row.get('building', '') for row in rows} - self.buildings.keys()
+        for name in names:
+            self.buildings[name] = []
+        for name, pk in Building.objects.filter(name__in=names).values_list('name', 'id'):
+            self.buildings[name].append(pk)
+        numbers = {row.get('unit_number', '') for row in rows}
+        self.unit_numbers.update(Unit.objects.filter(unit_number__in=numbers).values_list('unit_number', flat=True))
+
+    def build(self, row):
+        building_ids = self.buildings.get(row.get('building', ''), [])
+        if len(building_ids) != 1:
+            problem = 'is ambiguous' if building_ids else 'does not exist'
+            raise ValidationError({'building': f"Building '{row.get('building', '')}' {problem}."})
+        unit_number = row.get('unit_number', '')
+        if unit_number in self.unit_numbers:
+            raise ValidationError({'unit_number': f"Unit '{unit_number}' already exists."})
+        return Unit(
+            building_id=building_ids[0],
+            unit_number=unit_number,
+            type=row.get('type', '').lower(),
+            rent_amount=row.get('rent_amount', ''),
+        )
+
+    def accept(self, obj):
+        self.unit_numbers.add(obj.unit_number)
+
+    def forget(self, obj):
+        self.unit_numbers.discard(obj.unit_number)
+
+
+class TenantImporter(BaseImporter):
+    model = Tenant
+    exclude = ('unit', 'profile_photo')
+
+    def __init__(self, batch_size=1000):
+        super().__init__(batch_size)
+        self.emails = set()
+        self.id_numbers = set()
+        self.units = {}
+        self.occupied = set()
+
+    def prefetch(self, rows):
+        self.emails.update(Tenant.objects.filter(
+            email__in={row.get('email', '') for row in rows},
+        ).values_list('email', flat=True))
+        self.id_numbers.update(Tenant.objects.filter(
+            id_number__in={row.get('id_number', '') for row in rows},
+        ).values_list('id_number', flat=True))
+        numbers = {row.get('unit', '') for row in rows} - {''} - self.units.keys()
+        self.units.update(Unit.objects.filter(unit_number__in=numbers).values_list('unit_number', 'id'))
+        self.occupied.update(Tenant.objects.filter(
+            unit_id__in=[self.units[number] for number in numbers if number in self.units],
+        ).values_list('unit_id', flat=True))
+
+    def build(self, row):
+        errors = {}
+        email, id_number, unit_number = row.get('email', ''), row.get('id_number', ''), row.get('unit', '')
+        if email in self.emails:
+            errors['email'] = f"A tenant with email '{email}' already exists."
+        if id_number in self.id_numbers:
+            errors['id_number'] = f"A tenant with ID number '{id_number}' already exists."
+        unit_id = None
+        if unit_number:
+            unit_id = self.units.get(unit_number)
+            if unit_id is None:
+                errors['unit'] = f"Unit '{unit_number}' does not exist."
+            elif unit_id in self.occupied:
+                errors['unit'] = f"Unit '{unit_number}' is already occupied by another tenant."
+        if errors:
+            raise ValidationError(errors)
+        return Tenant(
+            name=row.get('name', ''),
+            phone=row.get('phone', ''),
+            email=email,
+            id_number=id_number,
+            status=row.get('status', '').lower() or 'active',
+            unit_id=unit_id,
+        )
+
+    def accept(self, obj):
+        self.emails.add(obj.email)
+        self.id_numbers.add(obj.id_number)
+        if obj.unit_id:
+            self.occupied.add(obj.unit_id)
+
+    def forget(self, obj):
+        self.emails.discard(obj.email)
+        self.id_numbers.discard(obj.id_number)
+        self.occupied.discard(obj.unit_id)
+
+    def after_insert(self, objs):
+        sync_units(obj.unit_id for obj in objs)
+
+
+IMPORTERS = {
+    'buildings': BuildingImporter,
+    'units': UnitImporter,
+    'tenants': TenantImporter,
+}
+
+
+def import_file(kind, fileobj, filename, batch_size=1000):
+    return IMPORTERS[kind](batch_size=batch_size).run(read_rows(fileobj, filename))
@@ -0,0 +1,55 @@
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+
+from . import caching, ledger, summaries
+from .models import RentPayment, Tenant
+
+
+@dataclass
+class InvoiceRun:
+    year: int
+    month: int
+    created: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+
+def generate_invoices(year, month, units=None, batch_size=500):
+    run = InvoiceRun(year=year, month=month)
+    started = time.perf_counter()
+
+    occupants = Tenant.objects.filter(unit__status='occupied')
+    if units is not None:
+        occupants = occupants.filter(unit__in=units)
+
+    with transaction.atomic():
+        existing = set(RentPayment.objects.filter(year=year, month=month).values_list('tenant_id', 'unit_id'))
+        deltas = defaultdict(lambda: [0, Decimal('0')])
+        pending = []
+        for tenant_id, unit_id, building_id, rent in occupants.values_list(
+            'id', 'unit_id', 'unit__building_id', 'unit__rent_amount',
+        ).order_by('unit_id'):
+            if (tenant_id, unit_id) in existing:
+                run.skipped += 1
+                continue
+            pending.append(RentPayment(tenant_id=tenant_id, unit_id=unit_id, amount=rent, year=year, month=month))
+            delta = deltas[(building_id, year, month, 'unpaid')]
+            delta[0] += 1
+            delta[1] += rent
+
+        rows = iter(pending)
+        while batch := list(islice(rows, batch_size)):
+            RentPayment.objects.bulk_create(batch)
+            run.created += len(batch)
+        ledger.apply_deltas(deltas)
+        if run.created:
+            summaries.refresh(payment.tenant_id for payment in pending)
+            caching.bump(RentPayment)
+
+    run.elapsed = time.perf_counter() - started
+    return run
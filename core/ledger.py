@@ -0,0 +1,131 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+
+from . import caching
+from .models import RentLedger, RentPayment, Unit
+
+
+def payment_state(pk):
+    # Locked so a concurrent save of the same payment waits for this one and
+    # then sees its result, instead of both subtracting the same old state.
+    return (
+        RentPayment.objects.select_for_update(of=('self',)).filter(pk=pk)
+        .values('tenant_id', 'year', 'month', 'status', 'amount', building_id=F('unit__building_id'))
+        .first()
+    )
+
+
+def _key(state):
+    return state['building_id'], state['year'], state['month'], state['status']
+
+
+def apply_deltas(deltas):
+    caching.bump(RentLedger)
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    existing = set(
+        RentLedger.objects.filter(building_id__in={key[0] for key in deltas}, year__in={key[1] for key in deltas})
+        .values_list('building_id', 'year', 'month', 'status')
+    )
+    # Rows that exist are adjusted by one statement executed for every key,
+    # rather than compiling an ORM update per key.
+    table = connection.ops.quote_name(RentLedger._meta.db_table)
+    column = {
+        name: connection.ops.quote_name(RentLedger._meta.get_field(name).column)
+        for name in ('payment_count', 'total_amount', 'building', 'year', 'month', 'status')
+    }
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET "
+            f"{column['payment_count']} = {column['payment_count']} + %s, "
+            f"{column['total_amount']} = {column['total_amount']} + %s "
+            f"WHERE {' AND '.join(f'{column[name]} = %s' for name in ('building', 'year', 'month', 'status'))}",
+            [(count, amount, *key) for key, (count, amount) in deltas.items() if key in existing],
+        )
+    for key in deltas.keys() - existing:
+        count, amount = deltas[key]
+        building_id, year, month, status = key
+        lookup = {'building_id': building_id, 'year': year, 'month': month, 'status': status}
+        changes = {'payment_count': F('payment_count') + count, 'total_amount': F('total_amount') + amount}
+        try:
+            with transaction.atomic():
+                RentLedger.objects.create(**lookup, payment_count=count, total_amount=amount)
+        except IntegrityError:
+            RentLedger.objects.filter(**lookup).update(**changes)
+
+
+def record_change(previous, current):
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    if previous is not None:
+        delta = deltas[_key(previous)]
+        delta[0] -= 1
+        delta[1] -= Decimal(previous['amount'])
+    if current is not None:
+        delta = deltas[_key(current)]
+        delta[0] += 1
+        delta[1] += Decimal(current['amount'])
+    apply_deltas(deltas)
+
+
+def aggregate_payments(queryset):
+    return (
+        queryset.order_by()
+        .values('year', 'month', 'status', building_id=F('unit__building_id'))
+        .annotate(payment_count=Count('id'), total_amount=Sum('amount'))
+    )
+
+
+def add_payments(queryset, sign=1):
+    apply_deltas({
+        _key(row): (sign * row['payment_count'], sign * row['total_amount'])
+        for row in aggregate_payments(queryset)
+    })
+
+
+def remove_payments(queryset):
+    add_payments(queryset, sign=-1)
+
+
+@transaction.atomic
+def rebuild():
+    RentLedger.objects.all().delete()
+    entries = RentLedger.objects.bulk_create(
+        [RentLedger(**row) for row in aggregate_payments(RentPayment.objects.all())],
+        batch_size=1000,
+    )
+    caching.bump(RentLedger)
+    return len(entries)
+
+
+def dashboard_summary(today):
+    units = Unit.objects.aggregate(total=Count('id'), occupied=Count('id', filter=Q(status='occupied')))
+    occupancy_rate = units['occupied'] * 100 / units['total'] if units['total'] else 0
+
+    buildings = {}
+    for entry in RentLedger.objects.filter(year=today.year, month=today.month).select_related('building'):
+        row = buildings.setdefault(entry.building_id, {
+            'building': entry.building,
+            'collected': Decimal('0'),
+            'outstanding': Decimal('0'),
+        })
+        row['collected' if entry.status == 'paid' else 'outstanding'] += entry.total_amount
+
+    arrears = RentLedger.objects.filter(status='unpaid').aggregate(
+        count=Sum('payment_count'),
+        amount=Sum('total_amount'),
+    )
+    return {
+        'period': today.replace(day=1),
+        'total_units': units['total'],
+        'occupied_units': units['occupied'],
+        'occupancy_rate': occupancy_rate,
+        'collected': sum((row['collected'] for row in buildings.values()), Decimal('0')),
+        'outstanding': sum((row['outstanding'] for row in buildings.values()), Decimal('0')),
+        'arrears_count': arrears['count'] or 0,
+        'arrears_amount': arrears['amount'] or Decimal('0'),
+        'buildings': sorted(buildings.values(), key=lambda row: row['building'].name),
+    }
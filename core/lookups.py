@@ -0,0 +1,109 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+
+from .models import Building, CustomUser, Tenant, Unit
+from .pagination import paginate
+
+PAGE_SIZE = 20
+
+
+class Lookup:
+    """Type-ahead source for a foreign key select.
+
+    Pages are keyset-paginated in an indexed order, so each one is a single
+    short query however large the table is.
+    """
+
+    def __init__(self, queryset, search_fields, ordering, label=str):
+        self.queryset = queryset
+        self.search_fields = search_fields
+        self.ordering = ordering
+        self.label = label
+
+    def search(self, text):
+        queryset = self.queryset
+        for word in text.split():
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def page(self, text='', cursor=None):
+        return paginate(self.search(text), self.ordering, cursor, PAGE_SIZE)
+
+
+units = Unit.objects.select_related('building').only('unit_number', 'status', 'building__name')
+
+LOOKUPS = {
+    'buildings': Lookup(Building.objects.only('name'), ('name', 'location'), ('name', 'id')),
+    'units': Lookup(units, ('unit_number', 'building__name'), ('unit_number',)),
+    'vacant-units': Lookup(units.filter(status='vacant'), ('unit_number', 'building__name'), ('status', 'unit_number')),
+    'tenants': Lookup(Tenant.objects.only('name'), ('name', 'id_number', 'email'), ('name', 'id')),
+    'tenant-accounts': Lookup(
+        CustomUser.objects.filter(role='tenant').only('name', 'email'), ('name', 'email', 'username'), ('email',),
+        label=lambda user: f"{user.name} ({user.email})",
+    ),
+}
+
+
+def lookup_view(request, source):
+    lookup = LOOKUPS.get(source)
+    if lookup is None:
+        raise Http404("Unknown lookup.")
+    page = lookup.page(request.GET.get('q', ''), request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': lookup.label(obj)} for obj in page],
+        'next_cursor': page.next_cursor,
+    })
+
+
+class AutocompleteSelect(forms.Select):
+    """A select that only renders the chosen option; the rest are fetched
+    from the lookup endpoint as the user types.
+
+    Validation is unchanged: ModelChoiceField looks up just the submitted pk
+    in the field's queryset.
+    """
+
+    class Media:
+        js = ['core/autocomplete.js']
+
+    def __init__(self, source, attrs=None):
+        super().__init__(attrs)
+        self.source = source
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete'] = reverse('lookup', args=[self.source])
+        return attrs
+
+    def use_required_attribute(self, initial):
+        # The blank option is always rendered first, so `required` is valid
+        # without peeking at the choices.
+        return not self.is_hidden
+
+    def optgroups(self, name, value, attrs=None):
+        # Re-rendering an invalid form passes back whatever was submitted;
+        # values that can't be a pk simply select nothing.
+        pk = self.choices.queryset.model._meta.pk
+        selected = []
+        for v in value:
+            try:
+                v = pk.to_python(v)
+            except ValidationError:
+                continue
+            if v not in (None, ''):
+                selected.append(v)
+        options = [self.create_option(name, '', self.choices.field.empty_label or '---------', False, 0)]
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=1):
+                option_value = self.choices.choice(obj)[0]
+                options.append(self.create_option(
+                    name, option_value, self.choices.field.label_from_instance(obj), True, index,
+                ))
+        return [(None, options, 0)]
@@ -0,0 +1,57 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import caching
+from core.models import Tenant
+from core.photos import process_photo
+
+
+class Command(BaseCommand):
+    help = "Strip EXIF, content-address and thumbnail every existing tenant photo in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--delete-originals', action='store_true',
+                            help="Remove original files that no tenant references afterwards.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        media_root = settings.MEDIA_ROOT
+        tenants = [
+            tenant for tenant in Tenant.objects.exclude(profile_photo='').exclude(profile_photo__isnull=True).only('id', 'profile_photo', 'thumbnails_ready')
+            if (Path(media_root) / tenant.profile_photo.name).exists()
+        ]
+        originals = {tenant.profile_photo.name for tenant in tenants}
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            names = list(executor.map(process_photo, (t.profile_photo.name for t in tenants), repeat(media_root), chunksize=8))
+
+        changed, renamed = [], 0
+        for tenant, name in zip(tenants, names):
+            if tenant.profile_photo.name != name:
+                tenant.profile_photo = name
+                renamed += 1
+            elif tenant.thumbnails_ready:
+                continue
+            tenant.thumbnails_ready = True
+            changed.append(tenant)
+        Tenant.objects.bulk_update(changed, ['profile_photo', 'thumbnails_ready'], batch_size=500)
+        caching.bump(Tenant)
+
+        removed = 0
+        if options['delete_originals']:
+            for name in originals - set(names):
+                os.remove(Path(media_root) / name)
+                removed += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(tenants)} photos ({len(set(names))} unique, {renamed} renamed, "
+            f"{removed} originals removed) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.backends import EmailBackend, user_cache_key
+
+
+class Command(BaseCommand):
+    help = "Measure per-request authentication overhead (timings and query counts)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000, help="Iterations for get_user.")
+        parser.add_argument('--logins', type=int, default=5, help="Iterations for authenticate (runs the hasher).")
+
+    def measure(self, label, fn, iterations):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"{label:<32} median {statistics.median(timings) * 1e6:10.1f} us   "
+            f"max {max(timings) * 1e6:10.1f} us   queries/call {len(queries) / iterations:.2f}"
+        )
+
+    def handle(self, *args, **options):
+        backend = EmailBackend()
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='bench-auth', email='bench-auth@example.com', password='bench-password', name='Bench',
+            )
+
+            def cold_get_user():
+                cache.delete(user_cache_key(user.pk))
+                backend.get_user(user.pk)
+
+            if settings.AUTH_USER_CACHE_TIMEOUT:
+                self.measure("get_user (cache miss)", cold_get_user, options['iterations'])
+                self.measure("get_user (cached)", lambda: backend.get_user(user.pk), options['iterations'])
+            else:
+                self.measure("get_user (not cached)", lambda: backend.get_user(user.pk), options['iterations'])
+            self.measure("authenticate by email", lambda: authenticate(
+                username='bench-auth@example.com', password='bench-password'), options['logins'])
+            self.measure("authenticate by username", lambda: authenticate(
+                username='bench-auth', password='bench-password'), options['logins'])
+            self.measure("authenticate wrong password", lambda: authenticate(
+                username='bench-auth@example.com', password='wrong'), options['logins'])
+            self.measure("authenticate unknown account", lambda: authenticate(
+                username='nobody@example.com', password='wrong'), options['logins'])
+            cache.delete(user_cache_key(user.pk))
+            transaction.set_rollback(True)
@@ -0,0 +1,116 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import audit
+
+
+def percentile(values, fraction):
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = "Log in from parallel clients against each session backend and report login throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--logins', type=int, default=50, help="Login/dashboard/logout cycles per worker.")
+        parser.add_argument('--backends', nargs='+', default=list(settings.SESSION_ENGINES), choices=list(settings.SESSION_ENGINES))
+        parser.add_argument(
+            '--real-hasher', action='store_true',
+            help="Hash passwords with the configured hasher instead of MD5, which otherwise dominates the timings.",
+        )
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher']}
+        # The bench users are deleted afterwards; keep them out of the audit log too.
+        with audit.suspended():
+            for backend in options['backends']:
+                with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[backend], **hashers):
+                    self.run(backend, options['workers'], options['logins'])
+
+    def run(self, backend, workers, logins):
+        User = get_user_model()
+        bench_users = User.objects.filter(username__startswith='bench-login-')
+        # Left over if an earlier run was killed before it could clean up.
+        bench_users.delete()
+        try:
+            users = [
+                User.objects.create_user(
+                    username=f'bench-login-{i}', email=f'bench-login-{i}@example.com', password='bench-password',
+                    name='Bench', role='admin',
+                )
+                for i in range(workers)
+            ]
+            login_times, page_times, errors, elapsed = self.log_in(users, logins)
+        finally:
+            bench_users.delete()
+        if not login_times:
+            raise CommandError(f"No logins succeeded with {backend}: {errors[:1]}")
+        self.report(backend, login_times, page_times, errors, elapsed)
+
+    def log_in(self, users, logins):
+        login_times, page_times, errors = [], [], []
+        lock = threading.Lock()
+
+        def work(user):
+            client = Client(SERVER_NAME='localhost')
+            local_logins, local_pages = [], []
+            try:
+                for _ in range(logins):
+                    started = time.perf_counter()
+                    response = client.post(reverse('login'), {'email': user.email, 'password': 'bench-password'})
+                    if response.status_code != 302:
+                        with lock:
+                            errors.append(f"login returned {response.status_code}")
+                        continue
+                    local_logins.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    response = client.get(reverse('admin_dashboard'))
+                    local_pages.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        with lock:
+                            errors.append(f"dashboard returned {response.status_code}")
+                    client.get(reverse('logout'))
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+            finally:
+                connections.close_all()
+            with lock:
+                login_times.extend(local_logins)
+                page_times.extend(local_pages)
+
+        threads = [threading.Thread(target=work, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return login_times, page_times, errors, time.perf_counter() - started
+
+    def report(self, backend, login_times, page_times, errors, elapsed):
+        login_times.sort()
+        page_times.sort()
+        self.stdout.write(self.style.SUCCESS(f"{backend}"))
+        self.stdout.write(f"  Throughput:  {len(login_times) / elapsed:.1f} logins/s over {elapsed:.2f}s")
+        self.stdout.write(
+            f"  Login:       p50 {statistics.median(login_times) * 1000:.1f} ms   "
+            f"p95 {percentile(login_times, 0.95) * 1000:.1f} ms"
+        )
+        if page_times:
+            self.stdout.write(
+                f"  Dashboard:   p50 {statistics.median(page_times) * 1000:.1f} ms   "
+                f"p95 {percentile(page_times, 0.95) * 1000:.1f} ms"
+            )
+        self.stdout.write(f"  Errors:      {len(errors)}")
+        for message in sorted(set(errors)):
+            self.stderr.write(f"    {message}")
@@ -0,0 +1,76 @@
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and measure wall time, query count and peak memory for every "
+        "route and model save path. Compares against a JSON baseline and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buildings', type=int, default=5)
+        parser.add_argument('--units', type=int, default=20, help="Units per building.")
+        parser.add_argument('--years', type=int, default=2, help="Years of payments per tenant.")
+        parser.add_argument('--repeat', type=int, default=9, help="Timed runs per benchmark; the median is kept.")
+        parser.add_argument('--only', nargs='*', help="Run only benchmarks whose name contains one of these.")
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--save', action='store_true', help="Write the results as the new baseline.")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Allowed slowdown or memory growth as a fraction of the baseline.")
+
+    def handle(self, *args, **options):
+        scale = {
+            'buildings': options['buildings'],
+            'units_per_building': options['units'],
+            'years': options['years'],
+        }
+        baseline_path = Path(options['baseline'])
+        baseline = None
+        if baseline_path.exists() and not options['save']:
+            baseline_scale, baseline = benchmarks.load(baseline_path)
+            if baseline_scale != scale:
+                raise CommandError(f"{baseline_path} was recorded at scale {baseline_scale}; rerun with that scale.")
+
+        skipped = []
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        databases = runner.setup_databases()
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, BACKGROUND_TASKS_INLINE=True, REQUEST_METRICS=False,
+                # Benchmarks clear the cache before every run; keep that away from the real one.
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': 'benchmark'}},
+            ):
+                results = benchmarks.run(scale, options['repeat'], date(2025, 6, 15), options['only'], skipped)
+        finally:
+            runner.teardown_databases(databases)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'benchmark':<36} {'ms':>9} {'queries':>8} {'peak KiB':>9}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<36} {result.seconds * 1000:9.2f} {result.queries:8d} {result.peak_kib:9.0f}")
+        for name in skipped:
+            self.stderr.write(f"Skipped {name}: no sample arguments for its URL.")
+
+        if options['save']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            benchmarks.dump(baseline_path, scale, results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {baseline_path}."))
+            return
+        if baseline is None:
+            self.stdout.write(f"No baseline at {baseline_path}; rerun with --save to record one.")
+            return
+        problems = benchmarks.regressions(baseline, results, options['threshold'])
+        if problems:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
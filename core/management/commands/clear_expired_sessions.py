@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches so other writers are not locked out."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = sessions.clear_expired(options['batch_size'], options['pause'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} expired sessions in {elapsed:.2f}s."))
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import arrears
+
+
+class Command(BaseCommand):
+    help = "Compute days overdue and late fees for every overdue RentPayment as of one date."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Evaluation date (YYYY-MM-DD); defaults to today.")
+        parser.add_argument('--keep-days', type=int, default=90,
+                            help="Delete snapshots older than this many days; 0 keeps them all.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            as_of = date.fromisoformat(options['date']) if options['date'] else today
+        except ValueError:
+            raise CommandError("Date must be in YYYY-MM-DD format.")
+        run = arrears.evaluate(as_of)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded {run.entries} overdue payments as of {run.as_of} "
+            f"({run.amount} owed, {run.late_fees} in late fees) in {run.elapsed:.2f}s."
+        ))
+        if options['keep_days']:
+            pruned = arrears.prune(options['keep_days'], today)
+            self.stdout.write(f"Pruned {pruned} snapshot rows older than {options['keep_days']} days.")
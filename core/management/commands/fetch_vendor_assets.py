@@ -0,0 +1,33 @@
+import base64
+import hashlib
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.staticfiles import VENDOR_ASSETS, static_dir
+
+
+class Command(BaseCommand):
+    help = "Download the vendored third-party static files and verify their integrity hashes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Download files that already exist.")
+
+    def handle(self, *args, **options):
+        for name, (url, integrity) in VENDOR_ASSETS.items():
+            target = static_dir() / name
+            if target.exists() and not options['force']:
+                self.stdout.write(f"{name} already present.")
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    data = response.read()
+            except OSError as e:
+                raise CommandError(f"Could not download {url}: {e}")
+            algorithm, expected = integrity.split('-', 1)
+            digest = base64.b64encode(hashlib.new(algorithm, data).digest()).decode()
+            if digest != expected:
+                raise CommandError(f"{url} does not match its integrity hash {integrity}.")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            self.stdout.write(self.style.SUCCESS(f"Saved {name} ({len(data)} bytes)."))
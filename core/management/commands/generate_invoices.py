@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.invoicing import generate_invoices
+
+
+class Command(BaseCommand):
+    help = "Create unpaid RentPayment rows for every occupied unit for one month."
+
+    def add_arguments(self, parser):
+        today = timezone.localdate()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--month', type=int, default=today.month)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not 1 <= options['month'] <= 12:
+            raise CommandError("Month must be between 1 and 12.")
+        run = generate_invoices(options['year'], options['month'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {run.created} invoices for {run.month}/{run.year} "
+            f"({run.skipped} already existed) in {run.elapsed:.2f}s."
+        ))
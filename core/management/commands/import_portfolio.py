@@ -0,0 +1,36 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import IMPORTERS, import_file
+
+
+class Command(BaseCommand):
+    help = "Stream buildings, units or tenants from a CSV or XLSX file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--errors', help="Write the per-row error report to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_file(options['kind'], fileobj, options['path'], options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as report:
+                writer = csv.writer(report)
+                writer.writerow(['line', 'error'])
+                writer.writerows(result.errors)
+        else:
+            for line, message in result.errors:
+                self.stderr.write(f"Line {line}: {message}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} of {result.rows} {options['kind']} "
+            f"({len(result.errors)} errors) in {result.elapsed:.2f}s."
+        ))
@@ -0,0 +1,102 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from core import audit
+from core.models import Building, RentPayment, Tenant, Unit
+
+
+class Command(BaseCommand):
+    help = "Write RentPayment rows from parallel workers and report throughput for the active database profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help="Payments written by each worker.")
+
+    def handle(self, *args, **options):
+        # The fixtures are deleted afterwards; keep them out of the audit log too.
+        with audit.suspended():
+            building = Building.objects.create(name='Load test', location='-', type='apartment')
+            try:
+                units = [
+                    Unit.objects.create(building=building, unit_number=f'loadtest-{building.pk}-{i}', type='studio', rent_amount=1000)
+                    for i in range(options['workers'])
+                ]
+                tenants = [
+                    Tenant.objects.create(
+                        name='Load test', phone='-', email=f'loadtest-{unit.pk}@example.com', id_number=f'loadtest-{unit.pk}', unit=unit,
+                    )
+                    for unit in units
+                ]
+                latencies, errors, elapsed = self.run(tenants, units, options['writes'])
+            finally:
+                # Tenants outlive a deleted unit, so remove them (and with them
+                # their payments) before the building.
+                Tenant.objects.filter(unit__building=building).delete()
+                building.delete()
+        self.report(latencies, errors, elapsed, options)
+
+    def run(self, tenants, units, writes):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def work(tenant, unit):
+            local = []
+            try:
+                for i in range(writes):
+                    if stop.is_set():
+                        break
+                    started = time.perf_counter()
+                    try:
+                        RentPayment.objects.create(
+                            tenant=tenant, unit=unit, amount=1000, year=3000 + i // 12, month=i % 12 + 1,
+                        )
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(str(e))
+                    else:
+                        local.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=work, args=pair) for pair in zip(tenants, units)]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            # On Ctrl-C, let the workers finish their current write before
+            # the fixtures are deleted underneath them.
+            stop.set()
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, latencies, errors, elapsed, options):
+        latencies.sort()
+        profile = connection.vendor
+        if profile == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                profile += f" (journal_mode={cursor.fetchone()[0]})"
+        self.stdout.write(f"Profile:     {profile}")
+        self.stdout.write(f"Workers:     {options['workers']} x {options['writes']} writes")
+        self.stdout.write(f"Throughput:  {len(latencies) / elapsed:.1f} writes/s over {elapsed:.2f}s")
+        if latencies:
+            self.stdout.write(
+                f"Latency:     p50 {statistics.median(latencies) * 1000:.1f} ms   "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms   "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
+        self.stdout.write(f"Errors:      {len(errors)}")
+        for message in sorted(set(errors)):
+            self.stderr.write(f"  {message}")
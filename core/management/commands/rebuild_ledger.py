@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-building monthly rent ledger from RentPayment rows."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = ledger.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} ledger rows in {elapsed:.2f}s."))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import occupancy
+
+
+class Command(BaseCommand):
+    help = "Repair Unit.status so it matches whether a tenant is assigned to the unit."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = occupancy.reconcile()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Repaired {count} unit statuses in {elapsed:.2f}s."))
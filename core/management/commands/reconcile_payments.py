@@ -0,0 +1,35 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.reconciliation import reconcile_file
+
+
+class Command(BaseCommand):
+    help = "Mark unpaid payments paid from a bank statement (CSV or XLSX) and report the lines that did not match."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--unmatched', help="Write the unmatched lines to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = reconcile_file(fileobj, options['path'], options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['unmatched']:
+            with open(options['unmatched'], 'w', newline='') as report:
+                writer = csv.writer(report)
+                writer.writerow(['line', 'reference', 'amount', 'reason'])
+                writer.writerows(result.unmatched)
+        else:
+            for line, reference, amount, reason in result.unmatched:
+                self.stderr.write(f"Line {line} ({reference}, {amount}): {reason}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {result.matched} of {result.lines} statement lines "
+            f"({len(result.unmatched)} unmatched) in {result.elapsed:.2f}s."
+        ))
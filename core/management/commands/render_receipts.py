@@ -0,0 +1,49 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import RentPayment
+from core.receipts import receipt_data, receipt_name, write_receipt
+
+
+class Command(BaseCommand):
+    help = "Render PDF receipts for every paid payment in one month, in parallel."
+
+    def add_arguments(self, parser):
+        today = timezone.localdate()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--month', type=int, default=today.month)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        if not 1 <= options['month'] <= 12:
+            raise CommandError("Month must be between 1 and 12.")
+        started = time.perf_counter()
+        media_root = settings.MEDIA_ROOT
+        payments = (
+            RentPayment.objects.filter(year=options['year'], month=options['month'], status='paid')
+            .select_related('tenant', 'unit__building')
+            .iterator(chunk_size=1000)
+        )
+        pending, cached = [], 0
+        for payment in payments:
+            data = receipt_data(payment)
+            if os.path.exists(os.path.join(media_root, receipt_name(data))):
+                cached += 1
+            else:
+                pending.append(data)
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for _ in executor.map(write_receipt, pending, repeat(media_root), chunksize=32):
+                pass
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(pending)} receipts for {options['month']}/{options['year']} "
+            f"({cached} already on disk) in {elapsed:.2f}s."
+        ))
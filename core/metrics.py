@@ -0,0 +1,120 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+# Upper bounds of the exported histogram buckets, per metric.
+METRICS = {
+    'request_duration_seconds': ('Request latency', (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)),
+    'request_queries': ('SQL queries per request', (1, 2, 5, 10, 20, 50, 100, 200)),
+    'request_sql_seconds': ('Time spent in SQL per request', (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)),
+    'request_template_seconds': ('Time spent rendering templates per request', (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)),
+}
+
+_placeholders = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_current = ContextVar('request_metrics', default=None)
+
+
+def sql_shape(sql):
+    # IN (...) lists change length with the data; collapse them so the same
+    # lookup repeated per row is recognised as one shape.
+    return _placeholders.sub('(...)', sql)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+_template_render_patched = False
+
+
+def instrument_templates():
+    global _template_render_patched
+    if _template_render_patched:
+        return
+    from django.template.backends.django import Template
+
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timings.template_time += time.perf_counter() - started
+
+    Template.render = timed_render
+    _template_render_patched = True
+
+
+class RollingHistograms:
+    """The last `window` samples of every metric, per route."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+
+    def observe(self, route, values):
+        with self.lock:
+            self.samples[route].append(values)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {route: list(samples) for route, samples in self.samples.items()}
+
+    def render(self, prefix='core_'):
+        snapshot = self.snapshot()
+        lines = []
+        for index, (name, (description, buckets)) in enumerate(METRICS.items()):
+            metric = prefix + name
+            lines.append(f'# HELP {metric} {description}, last {self.window} requests per route.')
+            lines.append(f'# TYPE {metric} histogram')
+            for route in sorted(snapshot):
+                values = [sample[index] for sample in snapshot[route]]
+                label = route.replace('\\', '\\\\').replace('"', '\\"')
+                for bound in buckets:
+                    count = sum(1 for value in values if value <= bound)
+                    lines.append(f'{metric}_bucket{{route="{label}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{route="{label}",le="+Inf"}} {len(values)}')
+                lines.append(f'{metric}_sum{{route="{label}"}} {sum(values):.6f}')
+                lines.append(f'{metric}_count{{route="{label}"}} {len(values)}')
+        return '\n'.join(lines) + '\n'
+
+
+histograms = RollingHistograms()
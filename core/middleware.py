@@ -0,0 +1,178 @@
+import logging
+import mimetypes
+import os
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import FileResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import audit, metrics
+from .staticfiles import ENCODINGS
+
+logger = logging.getLogger(__name__)
+
+
+class RoleRequiredMiddleware(MiddlewareMixin):
+    """Enforce core.urls.route_roles before any view, form or queryset is built."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from .urls import PUBLIC, route_roles
+
+        match = request.resolver_match
+        if match.namespaces or match.url_name not in route_roles:
+            return None
+        roles = route_roles[match.url_name]
+        if roles is PUBLIC:
+            return None
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if request.user.role not in roles:
+            messages.error(request, "Access denied: You are not authorized to view this page.")
+            return HttpResponseForbidden("Access denied")
+        return None
+
+
+class AuditUserMiddleware:
+    """Attribute audit log entries written during the request to its user."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = audit.current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = audit.current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            audit.current_request.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """Per-route latency, SQL and template timings; enabled by settings.REQUEST_METRICS."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.n_plus_one = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE', None)
+        metrics.histograms.window = getattr(settings, 'REQUEST_METRICS_WINDOW', 1000)
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        timings = metrics.RequestTimings()
+        token = timings.activate()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            metrics.RequestTimings.deactivate(token)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        metrics.histograms.observe(route, (elapsed, timings.queries, timings.sql_time, timings.template_time))
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.sql_time * 1000:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template_time * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+        if self.n_plus_one is not None:
+            for shape, count in timings.repeated(self.n_plus_one):
+                logger.warning("Possible N+1 on %s %s: %d queries shaped like %s",
+                               request.method, request.path, count, shape)
+        return response
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files from STATIC_ROOT without a web server.
+
+    The directory is indexed once at startup, so a request costs a dict
+    lookup and an open(). Files named in the manifest carry a content hash
+    and are cached for a year; precompressed .br/.gz copies are sent when
+    the client accepts them. Enabled by settings.STATIC_SERVE.
+    """
+
+    IMMUTABLE = 'public, max-age=31536000, immutable'
+    REVALIDATE = 'public, max-age=0, must-revalidate'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'STATIC_SERVE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.files = self.index(Path(settings.STATIC_ROOT))
+
+    def index(self, root):
+        files = {}
+        hashed = self.hashed_names(root)
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = Path(directory, name)
+                relative = path.relative_to(root).as_posix()
+                if relative.endswith(tuple(ENCODINGS.values())):
+                    continue
+                content_type, _ = mimetypes.guess_type(name)
+                stat = path.stat()
+                files[relative] = {
+                    'path': path,
+                    'content_type': content_type or 'application/octet-stream',
+                    'cache_control': self.IMMUTABLE if relative in hashed else self.REVALIDATE,
+                    'etag': f'"{int(stat.st_mtime):x}-{stat.st_size:x}"',
+                    'encodings': {
+                        encoding: Path(f'{path}{suffix}') for encoding, suffix in ENCODINGS.items()
+                        if Path(f'{path}{suffix}').exists()
+                    },
+                }
+        return files
+
+    def hashed_names(self, root):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        manifest = getattr(staticfiles_storage, 'hashed_files', None)
+        return set(manifest.values()) if manifest else set()
+
+    def __call__(self, request):
+        if not request.path_info.startswith(self.prefix) or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        entry = self.files.get(request.path_info[len(self.prefix):])
+        if entry is None:
+            return self.get_response(request)
+        if request.headers.get('If-None-Match') == entry['etag']:
+            response = HttpResponseNotModified()
+        else:
+            accepted = request.headers.get('Accept-Encoding', '')
+            path, encoding = entry['path'], None
+            for candidate, variant in entry['encodings'].items():
+                if candidate in accepted:
+                    path, encoding = variant, candidate
+                    break
+            response = FileResponse(open(path, 'rb'), content_type=entry['content_type'])
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Cache-Control'] = entry['cache_control']
+        response['ETag'] = entry['etag']
+        if entry['encodings']:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
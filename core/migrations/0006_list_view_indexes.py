@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_rentpayment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rentpayment',
+            index=models.Index(fields=['year', 'month', 'id'], name='payment_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentpayment',
+            index=models.Index(fields=['status', 'year', 'month', 'id'], name='payment_status_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['name', 'id'], name='tenant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['status', 'name', 'id'], name='tenant_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['status', 'unit_number'], name='unit_status_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['building', 'unit_number'], name='unit_building_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['rent_amount', 'id'], name='unit_rent_idx'),
+        ),
+    ]
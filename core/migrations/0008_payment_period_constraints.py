@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_rentledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rentpayment',
+            name='receipt_number',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='rentpayment',
+            constraint=models.UniqueConstraint(fields=('tenant', 'unit', 'year', 'month'), name='unique_payment_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='rentpayment',
+            constraint=models.UniqueConstraint(condition=models.Q(('receipt_number', ''), _negated=True), fields=('receipt_number',), name='unique_receipt_number'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_payment_period_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rentpayment',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='rentpayment',
+            name='unit',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.unit'),
+        ),
+        migrations.AddIndex(
+            model_name='rentpayment',
+            index=models.Index(fields=['year', 'month', 'status'], name='payment_period_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentpayment',
+            index=models.Index(fields=['tenant', 'year', 'month'], name='payment_tenant_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentpayment',
+            index=models.Index(fields=['unit', 'year', 'month'], name='payment_unit_period_idx'),
+        ),
+    ]
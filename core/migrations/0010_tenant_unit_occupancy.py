@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_payment_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='tenant',
+            constraint=models.UniqueConstraint(fields=('unit',), name='unique_tenant_per_unit', violation_error_message='This unit is already occupied by another tenant.'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_tenant_unit_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantSummary',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.tenant')),
+                ('paid_count', models.IntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unpaid_count', models.IntegerField(default=0)),
+                ('outstanding_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='user',
+            field=models.OneToOneField(blank=True, limit_choices_to={'role': 'tenant'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tenant_profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
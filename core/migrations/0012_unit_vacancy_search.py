@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE core_building_fts USING fts5(
+        name, location, content='core_building', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER core_building_fts_insert AFTER INSERT ON core_building BEGIN
+        INSERT INTO core_building_fts(rowid, name, location) VALUES (new.id, new.name, new.location);
+    END""",
+    """CREATE TRIGGER core_building_fts_delete AFTER DELETE ON core_building BEGIN
+        INSERT INTO core_building_fts(core_building_fts, rowid, name, location)
+        VALUES ('delete', old.id, old.name, old.location);
+    END""",
+    """CREATE TRIGGER core_building_fts_update AFTER UPDATE OF name, location ON core_building BEGIN
+        INSERT INTO core_building_fts(core_building_fts, rowid, name, location)
+        VALUES ('delete', old.id, old.name, old.location);
+        INSERT INTO core_building_fts(rowid, name, location) VALUES (new.id, new.name, new.location);
+    END""",
+    "INSERT INTO core_building_fts(core_building_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS core_building_fts_update',
+    'DROP TRIGGER IF EXISTS core_building_fts_delete',
+    'DROP TRIGGER IF EXISTS core_building_fts_insert',
+    'DROP TABLE IF EXISTS core_building_fts',
+]
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS building_name_trgm_idx ON core_building USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS building_location_trgm_idx ON core_building USING gin (location gin_trgm_ops)',
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS building_location_trgm_idx',
+    'DROP INDEX IF EXISTS building_name_trgm_idx',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_tenant_portal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['status', 'type', 'rent_amount', 'building'], name='unit_vacancy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['status', 'rent_amount', 'id'], name='unit_status_rent_idx'),
+        ),
+        # Free-text search over Building.name/location: an FTS5 index kept in
+        # sync by triggers on SQLite, trigram indexes on PostgreSQL. A later
+        # SQLite migration that rebuilds core_building must recreate the
+        # triggers.
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
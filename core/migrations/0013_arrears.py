@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:34
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_unit_vacancy_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LateFeePolicy',
+            fields=[
+                ('building', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='late_fee_policy', serialize=False, to='core.building')),
+                ('due_day', models.PositiveSmallIntegerField(default=1, help_text='Day of the month rent is due.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(28)])),
+                ('grace_days', models.PositiveSmallIntegerField(default=0, help_text='Days after the due date before fees start.')),
+                ('flat_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('daily_rate', models.DecimalField(decimal_places=2, default=0, help_text='Percent of the rent charged for each day past the grace period.', max_digits=5)),
+                ('max_fee', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'late fee policies',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArrearsEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('due_date', models.DateField()),
+                ('days_overdue', models.IntegerField()),
+                ('late_fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrears', to='core.building')),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrears', to='core.rentpayment')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='arrears', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['as_of', 'tenant'], name='arrears_as_of_tenant_idx'), models.Index(fields=['as_of', 'building'], name='arrears_as_of_building_idx')],
+                'constraints': [models.UniqueConstraint(fields=('as_of', 'payment'), name='unique_arrears_payment')],
+            },
+        ),
+    ]
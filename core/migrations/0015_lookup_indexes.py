@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_audit_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['name', 'id'], name='building_name_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:45
+
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_thumbnails(apps, schema_editor):
+    # Photos thumbnailed before the flag existed; the rest keep showing the
+    # original until `manage.py backfill_photos` runs.
+    Tenant = apps.get_model('core', 'Tenant')
+    thumbs = Path(settings.MEDIA_ROOT) / 'tenant_photos' / 'thumbs'
+    ready = [
+        pk for pk, name in Tenant.objects.exclude(profile_photo='').exclude(profile_photo__isnull=True)
+        .values_list('pk', 'profile_photo')
+        if all(
+            (thumbs / f'{PurePosixPath(name).stem}_{size}.{ext}').exists()
+            for size in (64, 256) for ext in ('webp', 'jpg')
+        )
+    ]
+    Tenant.objects.filter(pk__in=ready).update(thumbnails_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_existing_thumbnails, migrations.RunPython.noop),
+    ]
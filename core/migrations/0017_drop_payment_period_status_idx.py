@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_tenant_thumbnails_ready'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='rentpayment',
+            name='payment_period_status_idx',
+        ),
+    ]
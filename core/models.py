@@ -1,8 +1,33 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+class CompactJSONEncoder(DjangoJSONEncoder):
+    item_separator = ','
+    key_separator = ':'
+
+class AuditedModel(models.Model):
+    # Remembers the column values an instance was loaded with so core.audit
+    # can diff them on save without reading the row again.
+    _audit_state = None
 
-class CustomUser(AbstractUser):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_state = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
+class CustomUser(AbstractUser, AuditedModel):
     ROLE_CHOICES = (
         ('admin', 'Admin'),
         ('tenant', 'Tenant'),
@@ -19,7 +44,7 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.name
 
-class Building(models.Model):
+class Building(AuditedModel):
     TYPE_CHOICES = (
         ('apartment', 'Apartment'),
         ('house', 'House'),
@@ -29,10 +54,15 @@ class Building(models.Model):
     type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     description = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='building_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
-class Unit(models.Model):
+class Unit(AuditedModel):
     TYPE_CHOICES = (
         ('studio', 'Studio'),
         ('1-bedroom', '1-Bedroom'),
@@ -49,10 +79,21 @@ class Unit(models.Model):
     rent_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='vacant')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'unit_number'], name='unit_status_number_idx'),
+            models.Index(fields=['building', 'unit_number'], name='unit_building_number_idx'),
+            models.Index(fields=['rent_amount', 'id'], name='unit_rent_idx'),
+            # Vacancy search: filters and facet counts are answered from the
+            # first index, results in rent order from the second.
+            models.Index(fields=['status', 'type', 'rent_amount', 'building'], name='unit_vacancy_idx'),
+            models.Index(fields=['status', 'rent_amount', 'id'], name='unit_status_rent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.unit_number} - {self.building.name}"
 
-class Tenant(models.Model):
+class Tenant(AuditedModel):
     STATUS_CHOICES = (
         ('active', 'Active'),
         ('inactive', 'Inactive'),
@@ -62,52 +103,99 @@ class Tenant(models.Model):
     email = models.EmailField(unique=True)
     id_number = models.CharField(max_length=50, unique=True)
     profile_photo = models.ImageField(upload_to='tenant_photos/', blank=True, null=True)
+    # Set once the background worker has written every thumbnail size.
+    thumbnails_ready = models.BooleanField(default=False, editable=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True, related_name='tenants')
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        limit_choices_to={'role': 'tenant'}, related_name='tenant_profile',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unit'],
+                name='unique_tenant_per_unit',
+                violation_error_message="This unit is already occupied by another tenant.",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['name', 'id'], name='tenant_name_idx'),
+            models.Index(fields=['status', 'name', 'id'], name='tenant_status_name_idx'),
+        ]
+
+    _loaded_unit_id = None
 
     def __str__(self):
         return self.name
 
-    def clean(self):
-        if self.unit and self.unit.tenants.exclude(id=self.id).exists():
-            raise ValidationError(f"Unit '{self.unit.unit_number}' is already occupied by another tenant.")
-        super().clean()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_unit_id = instance.__dict__.get('unit_id')
+        return instance
+
+    @property
+    def profile_thumbnails(self):
+        from .photos import thumbnail_urls
+        return thumbnail_urls(self.profile_photo.name, self.thumbnails_ready) if self.profile_photo else {}
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
-        if self.unit:
-            self.unit.status = 'occupied'
-            self.unit.save()
-        elif self.pk:
-            try:
-                old_tenant = Tenant.objects.get(pk=self.pk)
-                if old_tenant.unit:
-                    old_unit = old_tenant.unit
-                    old_unit.status = 'vacant'
-                    old_unit.save()
-            except Tenant.DoesNotExist:
-                pass
-
-class RentPayment(models.Model):
+        new_photo = bool(self.profile_photo) and not self.profile_photo._committed
+        if new_photo:
+            from .photos import prepare_upload, store_photo
+            name, content = prepare_upload(self.profile_photo)
+            self.profile_photo = name
+            self.thumbnails_ready = False
+            # Written only once the row commits, so a rollback leaves no file.
+            transaction.on_commit(partial(store_photo, name, content))
+        from .occupancy import sync_units
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.unit_id != self._loaded_unit_id:
+                sync_units([self._loaded_unit_id, self.unit_id])
+        self._loaded_unit_id = self.unit_id
+
+class RentPayment(AuditedModel):
     STATUS_CHOICES = (
         ('paid', 'Paid'),
         ('unpaid', 'Unpaid'),
     )
-    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='payments')
-    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='payments')
+    # Lookups by tenant or unit are served by the composite indexes in Meta.
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='payments', db_index=False)
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='payments', db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     month = models.IntegerField(choices=[(i, i) for i in range(1, 13)])
     year = models.IntegerField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='unpaid')
     payment_date = models.DateField(null=True, blank=True)
-    receipt_number = models.CharField(max_length=50, unique=True, blank=True)
+    receipt_number = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'unit', 'year', 'month'], name='unique_payment_period'),
+            models.UniqueConstraint(
+                fields=['receipt_number'],
+                condition=~models.Q(receipt_number=''),
+                name='unique_receipt_number',
+            ),
+        ]
+        indexes = [
+            # Payment list, exports and invoicing: one period, keyset-ordered.
+            models.Index(fields=['year', 'month', 'id'], name='payment_period_idx'),
+            # Status-filtered lists and arrears, in period order.
+            models.Index(fields=['status', 'year', 'month', 'id'], name='payment_status_period_idx'),
+            # A tenant's or unit's payment history, newest first.
+            models.Index(fields=['tenant', 'year', 'month'], name='payment_tenant_period_idx'),
+            models.Index(fields=['unit', 'year', 'month'], name='payment_unit_period_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tenant.name} - {self.month}/{self.year}"
 
     def clean(self):
-        if self.tenant.unit != self.unit:
+        if self.tenant_id and self.tenant.unit_id != self.unit_id:
             raise ValidationError("The tenant must be assigned to the selected unit.")
         if self.payment_date and self.status == 'unpaid':
             raise ValidationError("Payment date should be empty for unpaid status.")
@@ -120,4 +208,132 @@ class RentPayment(models.Model):
             self.receipt_number = f"REC-{self.tenant.id}-{self.month}-{self.year}"
         elif self.status == 'unpaid':
             self.receipt_number = ''
-        super().save(*args, **kwargs)
\ No newline at end of file
+        from . import ledger, summaries
+        with transaction.atomic():
+            previous = ledger.payment_state(self.pk) if self.pk else None
+            super().save(*args, **kwargs)
+            ledger.record_change(previous, {
+                'building_id': self.unit.building_id,
+                'year': self.year,
+                'month': self.month,
+                'status': self.status,
+                'amount': self.amount,
+            })
+            summaries.refresh([self.tenant_id, previous and previous['tenant_id']])
+
+    def delete(self, *args, **kwargs):
+        from . import ledger, summaries
+        with transaction.atomic():
+            previous = ledger.payment_state(self.pk)
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                # Otherwise a concurrent delete got here first.
+                ledger.record_change(previous, None)
+                summaries.refresh([previous['tenant_id']])
+        return result
+
+class RentLedger(models.Model):
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='ledger_entries')
+    year = models.IntegerField()
+    month = models.IntegerField(choices=[(i, i) for i in range(1, 13)])
+    status = models.CharField(max_length=10, choices=RentPayment.STATUS_CHOICES)
+    payment_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month', 'status', 'building'], name='unique_ledger_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.building_id} - {self.month}/{self.year} ({self.status})"
+
+class TenantSummary(models.Model):
+    # Balance figures shown on the tenant dashboard, kept current by
+    # core.summaries whenever the tenant's payments change.
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    paid_count = models.IntegerField(default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unpaid_count = models.IntegerField(default=0)
+    outstanding_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_payment_date = models.DateField(null=True, blank=True)
+
+class LateFeePolicy(AuditedModel):
+    # Buildings without a policy use the field defaults: rent due on the 1st
+    # and no late fees.
+    building = models.OneToOneField(Building, on_delete=models.CASCADE, primary_key=True, related_name='late_fee_policy')
+    due_day = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(28)],
+        help_text="Day of the month rent is due.",
+    )
+    grace_days = models.PositiveSmallIntegerField(default=0, help_text="Days after the due date before fees start.")
+    flat_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    daily_rate = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0,
+        help_text="Percent of the rent charged for each day past the grace period.",
+    )
+    max_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'late fee policies'
+
+    def __str__(self):
+        return f"Late fees for {self.building_id}"
+
+class ArrearsEntry(models.Model):
+    # One row per overdue payment per evaluation date, written in bulk by
+    # core.arrears.evaluate().
+    as_of = models.DateField()
+    payment = models.ForeignKey(RentPayment, on_delete=models.CASCADE, related_name='arrears')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='arrears')
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='arrears')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    due_date = models.DateField()
+    days_overdue = models.IntegerField()
+    late_fee = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['as_of', 'payment'], name='unique_arrears_payment'),
+        ]
+        indexes = [
+            models.Index(fields=['as_of', 'tenant'], name='arrears_as_of_tenant_idx'),
+            models.Index(fields=['as_of', 'building'], name='arrears_as_of_building_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_id} as of {self.as_of}"
+
+class AuditEntry(models.Model):
+    # Append-only; rows are written in batches by core.audit.
+    ACTION_CHOICES = (
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    )
+    timestamp = models.DateTimeField()
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+        related_name='+',
+    )
+    changes = models.JSONField(encoder=CompactJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'object_id', 'timestamp'], name='audit_object_time_idx'),
+            models.Index(fields=['timestamp', 'id'], name='audit_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model} {self.object_id} at {self.timestamp}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Audit entries cannot be changed.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Audit entries cannot be deleted.")
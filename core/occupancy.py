@@ -0,0 +1,74 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, OuterRef, Value, When
+
+from . import audit, caching
+from .models import Tenant, Unit
+
+
+def occupancy_status():
+    # Derived in the database so concurrent moves can't leave a stale status
+    # behind: whichever UPDATE runs last sees the committed tenant rows.
+    return Case(
+        When(Exists(Tenant.objects.filter(unit=OuterRef('pk'))), then=Value('occupied')),
+        default=Value('vacant'),
+    )
+
+
+def sync_units(unit_ids):
+    unit_ids = {pk for pk in unit_ids if pk is not None}
+    if not unit_ids:
+        return 0
+    updated = Unit.objects.filter(pk__in=unit_ids).update(status=occupancy_status())
+    caching.bump(Unit)
+    return updated
+
+
+def reconcile():
+    status = occupancy_status()
+    repaired = Unit.objects.exclude(status=status).update(status=status)
+    if repaired:
+        caching.bump(Unit)
+    return repaired
+
+
+def move_tenants(assignments):
+    """Apply {tenant_id: unit_id or None} as one transaction."""
+    assignments = {int(tenant_id): unit_id for tenant_id, unit_id in assignments.items()}
+    targets = [unit_id for unit_id in assignments.values() if unit_id is not None]
+    if len(targets) != len(set(targets)):
+        raise ValidationError("Two tenants cannot be moved into the same unit.")
+    try:
+        with transaction.atomic():
+            instances = Tenant.objects.select_for_update().in_bulk(list(assignments))
+            tenants = {pk: tenant.unit_id for pk, tenant in instances.items()}
+            missing = assignments.keys() - tenants.keys()
+            if missing:
+                raise ValidationError(f"Unknown tenant ids: {', '.join(map(str, sorted(missing)))}.")
+            if Unit.objects.filter(pk__in=targets).count() != len(targets):
+                raise ValidationError("One or more target units do not exist.")
+            occupied = (
+                Tenant.objects.filter(unit_id__in=targets)
+                .exclude(pk__in=assignments)
+                .values_list('unit__unit_number', flat=True)
+            )
+            if occupied:
+                raise ValidationError(f"Units already occupied: {', '.join(sorted(occupied))}.")
+            # Clear the moving tenants first so swaps and chains never collide
+            # with the unique unit constraint halfway through.
+            moving = [pk for pk, unit_id in assignments.items() if tenants[pk] != unit_id]
+            Tenant.objects.filter(pk__in=moving).update(unit=None)
+            assigned = [pk for pk in moving if assignments[pk] is not None]
+            if assigned:
+                Tenant.objects.filter(pk__in=assigned).update(unit=Case(
+                    *(When(pk=pk, then=Value(assignments[pk])) for pk in assigned),
+                ))
+            sync_units([tenants[pk] for pk in moving] + [assignments[pk] for pk in moving])
+            caching.bump(Tenant)
+            # The updates above skip post_save, so log the moves here.
+            for pk in moving:
+                instances[pk].unit_id = assignments[pk]
+                audit.saved(instances[pk], False, ['unit'])
+    except IntegrityError:
+        raise ValidationError("Another change claimed one of the target units; please retry.")
+    return len(moving)
@@ -0,0 +1,145 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values, direction='next'):
+    payload = json.dumps({'v': [str(value) for value in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values, direction = data['v'], data['d']
+    except (ValueError, KeyError, TypeError):
+        return None, 'next'
+    if not isinstance(values, list) or direction not in ('next', 'prev'):
+        return None, 'next'
+    if not all(isinstance(value, str) for value in values):
+        return None, 'next'
+    return values, direction
+
+
+def _field(model, path):
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def cursor_values(model, ordering, values):
+    """Convert decoded cursor `values` to the ordering fields' types, or
+    return None if any of them doesn't fit, as in a tampered cursor."""
+    if len(values) != len(ordering):
+        return None
+    converted = []
+    for path, value in zip(ordering, values):
+        try:
+            field = _field(model, path.lstrip('-'))
+        except FieldDoesNotExist:
+            # An annotation; the database compares it as given.
+            converted.append(value)
+            continue
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except ValidationError:
+            return None
+        converted.append(value)
+    return converted
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def keyset_q(ordering, values):
+    # (a, b, c) > (x, y, z) spelled out as OR-ed prefixes so every backend can
+    # satisfy it from a composite index on the ordering columns.
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        term = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            term &= Q(**{previous.lstrip('-'): value})
+        condition |= term
+    return condition
+
+
+def row_values(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for attr in field.lstrip('-').split('__'):
+            value = getattr(value, attr)
+        values.append(value)
+    return values
+
+
+class KeysetPage:
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.ordering = ordering
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(row_values(self.object_list[-1], self.ordering))
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(row_values(self.object_list[0], self.ordering), 'prev')
+
+
+def paginate(queryset, ordering, cursor=None, page_size=50):
+    ordering = tuple(ordering)
+    values, direction = decode_cursor(cursor) if cursor else (None, 'next')
+    if values is not None:
+        values = cursor_values(queryset.model, ordering, values)
+    if values is None:
+        direction = 'next'
+
+    if values is not None and direction == 'prev':
+        backwards = reverse_ordering(ordering)
+        rows = list(queryset.order_by(*backwards).filter(keyset_q(backwards, values))[:page_size + 1])
+        has_previous = len(rows) > page_size
+        return KeysetPage(rows[:page_size][::-1], ordering, True, has_previous)
+
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(keyset_q(ordering, values))
+    rows = list(queryset[:page_size + 1])
+    return KeysetPage(rows[:page_size], ordering, len(rows) > page_size, values is not None)
+
+
+class KeysetPaginationMixin:
+    paginate_by = 50
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate(queryset, self.get_ordering(), self.request.GET.get(self.cursor_kwarg), page_size)
+        return None, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import caching, workers
+from .models import Tenant
+
+PHOTO_DIR = 'tenant_photos'
+THUMBNAIL_SIZES = {'small': 64, 'large': 256}
+THUMBNAIL_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+
+def normalize(fileobj):
+    # Re-encoding drops EXIF (GPS, camera serials) after the orientation tag
+    # has been applied, so the same picture always yields the same bytes.
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def photo_name(content):
+    return f"{PHOTO_DIR}/{hashlib.sha256(content).hexdigest()}.jpg"
+
+
+def thumbnail_name(name, size, ext):
+    return f"{PHOTO_DIR}/thumbs/{PurePosixPath(name).stem}_{size}.{ext}"
+
+
+def thumbnail_urls(name, ready=True):
+    # Until the worker has made the thumbnails, point at the original instead.
+    if not ready:
+        original = default_storage.url(name)
+        return {label: {ext: original for ext, _ in THUMBNAIL_FORMATS} for label in THUMBNAIL_SIZES}
+    return {
+        label: {ext: default_storage.url(thumbnail_name(name, size, ext)) for ext, _ in THUMBNAIL_FORMATS}
+        for label, size in THUMBNAIL_SIZES.items()
+    }
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+def make_thumbnails(name, media_root):
+    root = Path(media_root)
+    targets = [
+        (size, ext, fmt, root / thumbnail_name(name, size, ext))
+        for size in THUMBNAIL_SIZES.values()
+        for ext, fmt in THUMBNAIL_FORMATS
+    ]
+    targets = [target for target in targets if not target[3].exists()]
+    if not targets:
+        return
+    with Image.open(root / name) as image:
+        image = image.convert('RGB')
+        for size, ext, fmt, path in targets:
+            buffer = io.BytesIO()
+            ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS).save(buffer, fmt, quality=80)
+            _write(path, buffer.getvalue())
+
+
+def thumbnail_photo(name, media_root):
+    make_thumbnails(name, media_root)
+    Tenant.objects.filter(profile_photo=name, thumbnails_ready=False).update(thumbnails_ready=True)
+    # Cached tenant lists still show the original.
+    caching.bump(Tenant)
+
+
+def prepare_upload(upload):
+    content = normalize(upload)
+    return photo_name(content), content
+
+
+def store_photo(name, content):
+    # Content-addressed, so an existing file already holds these bytes.
+    path = Path(settings.MEDIA_ROOT) / name
+    if not path.exists():
+        _write(path, content)
+    workers.submit(thumbnail_photo, name, settings.MEDIA_ROOT)
+
+
+def process_photo(name, media_root):
+    root = Path(media_root)
+    with open(root / name, 'rb') as fileobj:
+        content = normalize(fileobj)
+    new_name = photo_name(content)
+    if not (root / new_name).exists():
+        _write(root / new_name, content)
+    make_thumbnails(new_name, media_root)
+    return new_name
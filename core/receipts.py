@@ -0,0 +1,91 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from . import workers
+from .models import RentPayment
+
+# Bump when the layout changes so every receipt is rendered again.
+LAYOUT_VERSION = 1
+
+
+def receipt_data(payment):
+    return {
+        'receipt_number': payment.receipt_number,
+        'tenant': payment.tenant.name,
+        'id_number': payment.tenant.id_number,
+        'unit': payment.unit.unit_number,
+        'building': payment.unit.building.name,
+        'location': payment.unit.building.location,
+        'amount': str(payment.amount),
+        'period': f"{payment.month}/{payment.year}",
+        'payment_date': payment.payment_date.isoformat() if payment.payment_date else '',
+    }
+
+
+def receipt_name(data):
+    payload = json.dumps([LAYOUT_VERSION, data], sort_keys=True).encode()
+    key = hashlib.sha256(payload).hexdigest()
+    return f"receipts/{key[:2]}/{key}.pdf"
+
+
+def render_pdf(data):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A5, pageCompression=1)
+    width, height = A5
+    pdf.setTitle(f"Receipt {data['receipt_number']}")
+    pdf.setFont('Helvetica-Bold', 16)
+    pdf.drawString(15 * mm, height - 20 * mm, "Rent Payment Receipt")
+    pdf.setFont('Helvetica', 11)
+    lines = (
+        ("Receipt number", data['receipt_number']),
+        ("Tenant", data['tenant']),
+        ("ID number", data['id_number']),
+        ("Unit", f"{data['unit']} - {data['building']}"),
+        ("Location", data['location']),
+        ("Period", data['period']),
+        ("Amount paid", data['amount']),
+        ("Payment date", data['payment_date']),
+    )
+    y = height - 35 * mm
+    for label, value in lines:
+        pdf.drawString(15 * mm, y, f"{label}:")
+        pdf.drawString(55 * mm, y, str(value))
+        y -= 8 * mm
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def write_receipt(data, media_root):
+    path = Path(media_root) / receipt_name(data)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(render_pdf(data))
+        os.replace(tmp, path)
+    return path
+
+
+def receipt_path(payment):
+    """The payment's receipt PDF, rendered here if the background render
+    scheduled on save hasn't written it yet.
+
+    Rendering one receipt takes milliseconds, so a download never waits on
+    the worker queue or asks the client to retry.
+    """
+    return write_receipt(receipt_data(payment), settings.MEDIA_ROOT)
+
+
+def schedule_receipt(payment_id):
+    payment = RentPayment.objects.select_related('tenant', 'unit__building').filter(pk=payment_id, status='paid').first()
+    if payment is not None:
+        workers.submit(write_receipt, receipt_data(payment), settings.MEDIA_ROOT)
@@ -0,0 +1,231 @@
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import islice
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Cast, Concat
+
+from . import audit, caching, ledger, summaries
+from .importers import _error_text, read_rows
+from .models import RentPayment, Tenant
+
+UPDATE_FIELDS = ['status', 'payment_date', 'receipt_number']
+
+_date = forms.DateField()
+_amount = forms.DecimalField(max_digits=10, decimal_places=2)
+_period = forms.DateField(required=False, input_formats=['%Y-%m', '%m/%Y'])
+
+
+@dataclass
+class ReconciliationResult:
+    lines: int = 0
+    matched: int = 0
+    unmatched: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+# Same format RentPayment.save() assigns one row at a time.
+RECEIPT_NUMBER = Concat(
+    Value('REC-'), Cast('tenant_id', CharField()), Value('-'), Cast('month', CharField()),
+    Value('-'), Cast('year', CharField()), output_field=CharField(),
+)
+
+
+def receipt_number(payment):
+    return f"REC-{payment.tenant_id}-{payment.month}-{payment.year}"
+
+
+def assign_receipts(payments):
+    """Give each payment its receipt number, checking for clashes in one query.
+
+    Returns the payments whose number had to deviate from RECEIPT_NUMBER.
+    """
+    numbers = {payment.pk: receipt_number(payment) for payment in payments}
+    # The non-empty condition lets the partial unique index answer this.
+    taken = set(
+        RentPayment.objects.filter(receipt_number__in=numbers.values()).exclude(receipt_number='')
+        .values_list('receipt_number', flat=True)
+    )
+    clashes = []
+    for payment in payments:
+        number = numbers[payment.pk]
+        if number in taken:
+            number = f"{number}-{payment.pk}"
+            clashes.append(payment)
+        payment.receipt_number = number
+        taken.add(number)
+    return clashes
+
+
+def mark_paid(dates, batch_size=500):
+    """Mark unpaid payments paid, `dates` mapping payment pk to payment date.
+
+    Each batch is written with one UPDATE per payment date, with the receipt
+    number built in SQL, plus a bulk_update for the few rows whose receipt
+    number clashes. This bypasses RentPayment.save(), so the ledger, tenant
+    summaries, audit log and fragment caches are updated here. Each batch
+    commits on its own, so a long statement doesn't hold the write lock
+    throughout. Payments that are already paid are skipped. Returns the
+    payments that were updated.
+    """
+    updated = []
+    pks = iter(dates)
+    while batch := list(islice(pks, batch_size)):
+        with transaction.atomic():
+            updated.extend(_mark_batch_paid(batch, dates))
+    return updated
+
+
+def _mark_batch_paid(batch, dates):
+    payments = list(
+        RentPayment.objects.select_for_update(of=('self',))
+        .filter(pk__in=batch, status='unpaid')
+        .annotate(building_id=F('unit__building_id'))
+    )
+    if not payments:
+        return payments
+    clashes = assign_receipts(payments)
+    by_date = defaultdict(list)
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for payment in payments:
+        payment.status = 'paid'
+        payment.payment_date = dates[payment.pk]
+        by_date[payment.payment_date].append(payment.pk)
+        for status, sign in (('unpaid', -1), ('paid', 1)):
+            delta = deltas[(payment.building_id, payment.year, payment.month, status)]
+            delta[0] += sign
+            delta[1] += sign * payment.amount
+    for payment_date, group in by_date.items():
+        RentPayment.objects.filter(pk__in=group).exclude(pk__in=[payment.pk for payment in clashes]).update(
+            status='paid', payment_date=payment_date, receipt_number=RECEIPT_NUMBER,
+        )
+    RentPayment.objects.bulk_update(clashes, UPDATE_FIELDS)
+    ledger.apply_deltas(deltas)
+    summaries.refresh(payment.tenant_id for payment in payments)
+    for payment in payments:
+        audit.saved(payment, False, UPDATE_FIELDS)
+    caching.bump(RentPayment)
+    return payments
+
+
+def _chunks(values, size=500):
+    values = iter(values)
+    while chunk := list(islice(values, size)):
+        yield chunk
+
+
+class StatementMatcher:
+    """Matches bank statement lines to unpaid payments.
+
+    Lines need `date`, `amount` and `reference` (the tenant's ID number or
+    email) and may give the rent `period` (YYYY-MM); without one the oldest
+    unpaid period for that amount is settled. The tenants and their unpaid
+    payments are loaded once into hash indexes, so matching a line is a
+    couple of dict lookups.
+    """
+
+    def __init__(self, lines):
+        references = {line['reference'] for line in lines} - {''}
+        self.tenants = {}
+        for chunk in _chunks(references):
+            lowered = [reference.lower() for reference in chunk]
+            for pk, id_number, email in Tenant.objects.filter(
+                Q(id_number__in=chunk) | Q(email__in=chunk) | Q(email__in=lowered),
+            ).values_list('pk', 'id_number', 'email'):
+                self.tenants.setdefault(id_number, pk)
+                self.tenants.setdefault(email.lower(), pk)
+
+        self.by_period = defaultdict(deque)
+        self.by_amount = defaultdict(deque)
+        for chunk in _chunks(set(self.tenants.values())):
+            for pk, tenant_id, amount, year, month in (
+                RentPayment.objects.filter(tenant_id__in=chunk, status='unpaid')
+                .order_by('year', 'month', 'pk').values_list('pk', 'tenant_id', 'amount', 'year', 'month')
+            ):
+                self.by_period[(tenant_id, amount, year, month)].append(pk)
+                self.by_amount[(tenant_id, amount)].append(pk)
+        self.claimed = set()
+
+    def tenant(self, reference):
+        return self.tenants.get(reference) or self.tenants.get(reference.lower())
+
+    def match(self, line):
+        """The matching payment pk for a parsed line; raises ValidationError if none."""
+        tenant_id = self.tenant(line['reference'])
+        if tenant_id is None:
+            raise ValidationError(f"No tenant with ID number or email '{line['reference']}'.")
+        if line['period'] is not None:
+            period = line['period']
+            pk = self._take(self.by_period.get((tenant_id, line['amount'], period.year, period.month)))
+            if pk is None:
+                raise ValidationError(f"No unpaid payment of {line['amount']} for {period:%Y-%m}.")
+        else:
+            pk = self._take(self.by_amount.get((tenant_id, line['amount'])))
+            if pk is None:
+                raise ValidationError(f"No unpaid payment of {line['amount']}.")
+        return pk
+
+    def _take(self, candidates):
+        # Both indexes share the payments, so skip ones another line claimed.
+        while candidates:
+            pk = candidates.popleft()
+            if pk not in self.claimed:
+                self.claimed.add(pk)
+                return pk
+        return None
+
+
+def parse_line(row):
+    errors = {}
+    line = {'reference': row.get('reference', '')}
+    for name, field_ in (('date', _date), ('amount', _amount), ('period', _period)):
+        try:
+            line[name] = field_.clean(row.get(name, ''))
+        except ValidationError as e:
+            errors[name] = e.messages
+    if not line['reference']:
+        errors['reference'] = ["This field is required."]
+    if errors:
+        raise ValidationError(errors)
+    return line
+
+
+def reconcile(rows, batch_size=500):
+    """Settle the unpaid payments matched by bank statement `rows` of (line, row)."""
+    result = ReconciliationResult()
+    started = time.perf_counter()
+    parsed = []
+    for number, row in rows:
+        result.lines += 1
+        try:
+            parsed.append((number, row, parse_line(row)))
+        except ValidationError as e:
+            result.unmatched.append((number, row.get('reference', ''), row.get('amount', ''), _error_text(e)))
+
+    matcher = StatementMatcher([line for _, _, line in parsed])
+    dates, sources = {}, {}
+    for number, row, line in parsed:
+        try:
+            pk = matcher.match(line)
+        except ValidationError as e:
+            result.unmatched.append((number, row.get('reference', ''), row.get('amount', ''), _error_text(e)))
+        else:
+            dates[pk], sources[pk] = line['date'], (number, row)
+
+    settled = {payment.pk for payment in mark_paid(dates, batch_size)}
+    result.matched = len(settled)
+    for pk in dates.keys() - settled:
+        number, row = sources[pk]
+        result.unmatched.append((number, row.get('reference', ''), row.get('amount', ''), "The payment was settled by someone else."))
+    result.unmatched.sort()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def reconcile_file(fileobj, filename, batch_size=500):
+    return reconcile(read_rows(fileobj, filename), batch_size)
@@ -0,0 +1,92 @@
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from . import caching
+from .models import Building, Unit
+from .pagination import paginate
+
+SEARCH_ORDERING = ('rent_amount', 'id')
+MAX_BUILDING_FACETS = 20
+
+_words = re.compile(r'\w+', re.UNICODE)
+
+
+def matching_buildings(text):
+    """Ids of buildings whose name or location matches every word of `text`."""
+    words = _words.findall(text)
+    if not words:
+        return None
+    if connection.vendor == 'sqlite':
+        query = ' '.join(f'"{word}"*' for word in words)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM core_building_fts WHERE core_building_fts MATCH %s', [query])
+            return [row[0] for row in cursor.fetchall()]
+    # PostgreSQL serves these ILIKE lookups from the trigram indexes.
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(location__icontains=word)
+    return list(Building.objects.filter(condition).values_list('id', flat=True))
+
+
+@dataclass
+class SearchResult:
+    page: object
+    type_facets: list = field(default_factory=list)
+    building_facets: list = field(default_factory=list)
+    total: int = 0
+
+
+def search_units(status='vacant', type=None, min_rent=None, max_rent=None, text='', building=None,
+                 cursor=None, page_size=25):
+    base = Unit.objects.all()
+    if status:
+        base = base.filter(status=status)
+    if min_rent is not None:
+        base = base.filter(rent_amount__gte=min_rent)
+    if max_rent is not None:
+        base = base.filter(rent_amount__lte=max_rent)
+    if text:
+        building_ids = matching_buildings(text)
+        if building_ids is not None:
+            base = base.filter(building_id__in=building_ids)
+
+    # Each facet ignores its own filter so the counts show the alternatives.
+    by_type = base.filter(building_id=building) if building else base
+    by_building = base.filter(type=type) if type else base
+    units = by_type.filter(type=type) if type else by_type
+
+    def facets():
+        type_counts = dict(by_type.order_by().values_list('type').annotate(count=Count('id')))
+        building_counts = list(
+            by_building.order_by().values('building_id').annotate(count=Count('id'))
+            .order_by('-count', 'building_id')[:MAX_BUILDING_FACETS]
+        )
+        names = dict(Building.objects.filter(
+            pk__in=[row['building_id'] for row in building_counts],
+        ).values_list('id', 'name'))
+        return {
+            'type': [
+                {'type': value, 'label': label, 'count': type_counts.get(value, 0)}
+                for value, label in Unit.TYPE_CHOICES
+            ],
+            'building': [
+                {'building': row['building_id'], 'name': names.get(row['building_id'], ''), 'count': row['count']}
+                for row in building_counts
+            ],
+            'total': type_counts.get(type, 0) if type else sum(type_counts.values()),
+        }
+
+    # Facet counts scan every match, so they are cached until a unit or
+    # building changes; the page itself is a short index range read.
+    counts = caching.cached(
+        'unit_search_facets', (Unit, Building), (status, type, min_rent, max_rent, text, building), facets,
+    )
+    return SearchResult(
+        page=paginate(units.select_related('building'), SEARCH_ORDERING, cursor, page_size),
+        type_facets=counts['type'],
+        building_facets=counts['building'],
+        total=counts['total'],
+    )
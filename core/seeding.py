@@ -0,0 +1,124 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, ledger, summaries
+from .models import Building, RentLedger, RentPayment, Tenant, Unit
+
+FIRST_NAMES = ('Amina', 'Brian', 'Caroline', 'David', 'Esther', 'Felix', 'Grace', 'Hassan', 'Irene', 'James',
+               'Kevin', 'Lucy', 'Mercy', 'Nelson', 'Olivia', 'Peter', 'Ruth', 'Samuel', 'Tabitha', 'Victor')
+LAST_NAMES = ('Achieng', 'Barasa', 'Cheruiyot', 'Kamau', 'Kariuki', 'Mutua', 'Njoroge', 'Ochieng', 'Otieno',
+              'Wambui', 'Wanjiku', 'Waweru')
+LOCATIONS = ('Kilimani', 'Westlands', 'Kileleshwa', 'Lavington', 'South B', 'Parklands', 'Ruaka', 'Kasarani')
+RENT_BY_TYPE = {'studio': 15000, '1-bedroom': 25000, '2-bedroom': 40000, '3-bedroom': 60000}
+
+
+@dataclass
+class SeedRun:
+    buildings: int = 0
+    units: int = 0
+    tenants: int = 0
+    payments: int = 0
+    elapsed: float = 0.0
+
+
+def _periods(end, months):
+    year, month = end.year, end.month
+    periods = []
+    for _ in range(months):
+        periods.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return periods[::-1]
+
+
+def _bulk_create(model, objs, batch_size):
+    objs = iter(objs)
+    created = []
+    while batch := list(islice(objs, batch_size)):
+        created.extend(model.objects.bulk_create(batch))
+    return created
+
+
+@transaction.atomic
+def seed(buildings=10, units_per_building=20, occupancy=0.9, years=2, paid_rate=0.9,
+         prefix='seed', random_seed=0, today=None, batch_size=1000):
+    """Create a synthetic portfolio; the same arguments always produce the same rows."""
+    if Unit.objects.filter(unit_number__startswith=f'{prefix}-').exists():
+        raise ValueError(f"Units with the prefix '{prefix}' already exist; choose another prefix.")
+    rng = random.Random(random_seed)
+    run = SeedRun()
+    started = time.perf_counter()
+
+    building_objs = _bulk_create(Building, (
+        Building(
+            name=f'{prefix.title()} {LOCATIONS[i % len(LOCATIONS)]} {i + 1}',
+            location=f'{LOCATIONS[i % len(LOCATIONS)]}, Nairobi',
+            type='apartment' if rng.random() < 0.8 else 'house',
+        )
+        for i in range(buildings)
+    ), batch_size)
+    run.buildings = len(building_objs)
+
+    occupied = []
+
+    def units():
+        for building in building_objs:
+            for i in range(units_per_building):
+                unit_type = rng.choice(tuple(RENT_BY_TYPE))
+                rent = RENT_BY_TYPE[unit_type] + rng.randrange(0, 5000, 500)
+                status = 'occupied' if rng.random() < occupancy else 'vacant'
+                unit = Unit(
+                    building=building, unit_number=f'{prefix}-{building.pk}-{i + 1}',
+                    type=unit_type, rent_amount=rent, status=status,
+                )
+                if status == 'occupied':
+                    occupied.append(unit)
+                yield unit
+
+    run.units = len(_bulk_create(Unit, units(), batch_size))
+
+    tenant_objs = _bulk_create(Tenant, (
+        Tenant(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            phone=f'07{rng.randrange(10 ** 8):08d}',
+            email=f'{prefix}-{unit.pk}@example.com',
+            id_number=f'{prefix}-{unit.pk}',
+            unit=unit,
+        )
+        for unit in occupied
+    ), batch_size)
+    run.tenants = len(tenant_objs)
+
+    periods = _periods(today or timezone.localdate(), years * 12)
+
+    def payments():
+        for tenant in tenant_objs:
+            for year, month in periods:
+                paid = rng.random() < paid_rate
+                yield RentPayment(
+                    tenant=tenant, unit=tenant.unit, amount=Decimal(tenant.unit.rent_amount),
+                    year=year, month=month, status='paid' if paid else 'unpaid',
+                    payment_date=date(year, month, rng.randint(1, 10)) if paid else None,
+                    receipt_number=f'REC-{tenant.pk}-{month}-{year}' if paid else '',
+                )
+
+    rows = payments()
+    while batch := list(islice(rows, batch_size)):
+        RentPayment.objects.bulk_create(batch)
+        run.payments += len(batch)
+    # The buildings are new, so their ledger rows can be inserted outright.
+    _bulk_create(RentLedger, (
+        RentLedger(**row)
+        for row in ledger.aggregate_payments(RentPayment.objects.filter(unit__building__in=building_objs))
+    ), batch_size)
+
+    summaries.refresh(tenant.pk for tenant in tenant_objs)
+    caching.bump(Building, Unit, Tenant, RentPayment, RentLedger)
+    run.elapsed = time.perf_counter() - started
+    return run
@@ -0,0 +1,31 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def session_model():
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    return store.get_model_class() if hasattr(store, 'get_model_class') else None
+
+
+def clear_expired(batch_size=500, pause=0.0):
+    """Delete expired sessions a batch at a time.
+
+    Each batch is its own short transaction, so on SQLite logins and payment
+    writes get the write lock between batches instead of waiting for one
+    long DELETE. Returns the number of rows removed (0 for cookie sessions).
+    """
+    model = session_model()
+    if model is None:
+        return 0
+    now = timezone.now()
+    expired = model.objects.filter(expire_date__lt=now)
+    deleted = 0
+    while keys := list(expired.values_list('session_key', flat=True)[:batch_size]):
+        count, _ = model.objects.filter(session_key__in=keys, expire_date__lt=now).delete()
+        deleted += count
+        if pause:
+            time.sleep(pause)
+    return deleted
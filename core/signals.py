@@ -0,0 +1,69 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import audit, caching, ledger, occupancy, receipts, summaries
+from .backends import user_cache_key
+from .models import Building, CustomUser, RentPayment, Tenant, Unit
+
+
+@receiver(pre_delete, sender=Tenant)
+@receiver(pre_delete, sender=Unit)
+def remove_cascaded_payments(sender, instance, origin=None, **kwargs):
+    # Cascaded payment deletes never reach RentPayment.delete(), so take their
+    # totals out of the ledger in one grouped query before the rows go away.
+    # Ledger rows of a deleted building cascade on their own; the tenants of
+    # a deleted unit outlive it, so their summaries are refreshed afterwards.
+    field = 'tenant' if sender is Tenant else 'unit'
+    payments = RentPayment.objects.filter(**{field: instance})
+    if sender is Unit:
+        summaries.refresh_on_commit(payments.values_list('tenant_id', flat=True).distinct())
+    if isinstance(origin, Building):
+        return
+    ledger.remove_payments(payments)
+
+
+@receiver(post_save, sender=RentPayment)
+def render_receipt(sender, instance, **kwargs):
+    if instance.status == 'paid':
+        transaction.on_commit(partial(receipts.schedule_receipt, instance.pk))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def evict_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(post_delete, sender=Tenant)
+def release_unit(sender, instance, **kwargs):
+    occupancy.sync_units([instance.unit_id])
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=Unit)
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=RentPayment)
+@receiver(post_delete, sender=Building)
+@receiver(post_delete, sender=Unit)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_delete, sender=RentPayment)
+def invalidate_fragments(sender, **kwargs):
+    caching.bump(sender)
+
+
+def audit_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        audit.saved(instance, created, update_fields)
+
+
+def audit_delete(sender, instance, **kwargs):
+    audit.deleted(instance)
+
+
+for model in audit.MODELS:
+    post_save.connect(audit_save, sender=model, dispatch_uid=f'audit_save_{model._meta.model_name}')
+    post_delete.connect(audit_delete, sender=model, dispatch_uid=f'audit_delete_{model._meta.model_name}')
@@ -0,0 +1,78 @@
+// Type-ahead for <select data-autocomplete="/lookups/<source>/">. The select
+// starts with only its current option; matches are fetched as the user types.
+(function () {
+    function setup(select) {
+        var search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-1';
+        search.placeholder = 'Type to search...';
+        search.setAttribute('aria-label', 'Search');
+        select.parentNode.insertBefore(search, select);
+
+        var timer = null;
+        var request = 0;
+
+        function load(query, cursor) {
+            var url = select.dataset.autocomplete + '?q=' + encodeURIComponent(query);
+            if (cursor) {
+                url += '&cursor=' + encodeURIComponent(cursor);
+            }
+            var current = ++request;
+            fetch(url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (current !== request) {
+                        return;
+                    }
+                    render(data, query, cursor);
+                });
+        }
+
+        function render(data, query, cursor) {
+            var selected = select.value;
+            var more = select.querySelector('option[data-more]');
+            if (more) {
+                more.remove();
+            }
+            if (!cursor) {
+                Array.prototype.slice.call(select.options).forEach(function (option) {
+                    if (option.value && option.value !== selected) {
+                        option.remove();
+                    }
+                });
+            }
+            data.results.forEach(function (item) {
+                if (String(item.id) === selected) {
+                    return;
+                }
+                select.add(new Option(item.text, item.id));
+            });
+            if (data.next_cursor) {
+                var option = new Option('Load more...', '');
+                option.dataset.more = data.next_cursor;
+                option.dataset.query = query;
+                select.add(option);
+            }
+        }
+
+        search.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { load(search.value.trim()); }, 250);
+        });
+        select.addEventListener('focus', function () {
+            if (select.options.length <= 2 && !select.dataset.loaded) {
+                select.dataset.loaded = '1';
+                load(search.value.trim());
+            }
+        });
+        select.addEventListener('change', function () {
+            var option = select.options[select.selectedIndex];
+            if (option && option.dataset.more) {
+                select.selectedIndex = 0;
+                load(option.dataset.query, option.dataset.more);
+            }
+        });
+    }
+
+    document.querySelectorAll('select[data-autocomplete]').forEach(setup);
+})();
@@ -0,0 +1,99 @@
+import functools
+import gzip
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core import checks
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Third-party assets served from our own static files, fetched with
+# `manage.py fetch_vendor_assets`, which checks each file against the
+# published Subresource Integrity hash. With VENDOR_ASSETS_CDN pages load
+# them from the CDN with the same hash.
+VENDOR_ASSETS = {
+    'core/vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+        'sha384-9ndCyUaIbzAi2FUVXJi0CjmCapSmO7SnpJef0486qhLnuZ2cdeRhO02iuK6FUUVM',
+    ),
+    'core/vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+        'sha384-geWF76RCwLtnZ8qwWowPQNguL3RmwHVBC9FhGdlKrxdiJJigb/j/68SIy3Te4Bkz',
+    ),
+}
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.html')
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def static_dir():
+    return Path(apps.get_app_config('core').path) / 'static'
+
+
+@functools.cache
+def vendor_source(name):
+    """(url, integrity) for a vendored asset, resolved once per process."""
+    url, integrity = VENDOR_ASSETS[name]
+    if settings.VENDOR_ASSETS_CDN:
+        return url, integrity
+    return staticfiles_storage.url(name), integrity
+
+
+@receiver(setting_changed)
+def reset_vendor_sources(setting, **kwargs):
+    if setting in ('STORAGES', 'STATIC_URL', 'VENDOR_ASSETS_CDN'):
+        vendor_source.cache_clear()
+
+
+def compress(path):
+    """Write .gz (and .br when brotli is installed) next to `path` when that
+    makes the file smaller; returns the suffixes written.
+    """
+    data = path.read_bytes()
+    written = []
+    variants = [('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda: brotli.compress(data, quality=11)))
+    for suffix, encode in variants:
+        encoded = encode()
+        if len(encoded) < len(data):
+            path.with_name(path.name + suffix).write_bytes(encoded)
+            written.append(suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed file names plus precompressed copies for StaticFilesMiddleware."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in [*paths, *hashed]:
+            if name.endswith(COMPRESSIBLE):
+                compress(Path(self.path(name)))
+
+
+@checks.register()
+def check_vendor_assets(app_configs, **kwargs):
+    if settings.VENDOR_ASSETS_CDN:
+        return []
+    missing = [name for name in VENDOR_ASSETS if not (static_dir() / name).exists()]
+    if not missing:
+        return []
+    return [checks.Warning(
+        f"Vendored static files are missing, so pages load without them: {', '.join(missing)}.",
+        hint="Run `manage.py fetch_vendor_assets`, or set DJANGO_VENDOR_CDN=1 to load them from the CDN.",
+        id='core.W001',
+    )]
@@ -0,0 +1,51 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+
+from .models import RentPayment, Tenant, TenantSummary
+
+FIELDS = ('paid_count', 'paid_amount', 'unpaid_count', 'outstanding_amount', 'last_payment_date')
+
+
+def _totals(queryset):
+    paid, unpaid = Q(status='paid'), Q(status='unpaid')
+    return {
+        row.pop('tenant_id'): row
+        for row in queryset.order_by().values('tenant_id').annotate(
+            paid_count=Count('id', filter=paid),
+            paid_amount=Sum('amount', filter=paid, default=0),
+            unpaid_count=Count('id', filter=unpaid),
+            outstanding_amount=Sum('amount', filter=unpaid, default=0),
+            last_payment_date=Max('payment_date'),
+        )
+    }
+
+
+def refresh(tenant_ids, batch_size=500):
+    """Recompute the summaries of the given (existing) tenants from their payments."""
+    tenant_ids = iter({pk for pk in tenant_ids if pk is not None})
+    while batch := list(islice(tenant_ids, batch_size)):
+        totals = _totals(RentPayment.objects.filter(tenant_id__in=batch))
+        TenantSummary.objects.bulk_create(
+            [TenantSummary(tenant_id=pk, **totals.get(pk, {})) for pk in batch],
+            update_conflicts=True, unique_fields=['tenant'], update_fields=FIELDS,
+        )
+
+
+def refresh_on_commit(tenant_ids):
+    # For deletes that cascade past RentPayment.delete(); tenants deleted in
+    # the same transaction are skipped.
+    tenant_ids = list(tenant_ids)
+    transaction.on_commit(lambda: refresh(Tenant.objects.filter(pk__in=tenant_ids).values_list('pk', flat=True)))
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    totals = _totals(RentPayment.objects.all())
+    TenantSummary.objects.all().delete()
+    summaries = TenantSummary.objects.bulk_create(
+        [TenantSummary(tenant_id=pk, **totals.get(pk, {})) for pk in Tenant.objects.values_list('pk', flat=True)],
+        batch_size=batch_size,
+    )
+    return len(summaries)
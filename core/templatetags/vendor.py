@@ -0,0 +1,18 @@
+from django import template
+from django.utils.html import format_html
+
+from core.staticfiles import vendor_source
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_stylesheet(name):
+    url, integrity = vendor_source(name)
+    return format_html('<link href="{}" rel="stylesheet" integrity="{}" crossorigin="anonymous">', url, integrity)
+
+
+@register.simple_tag
+def vendor_script(name):
+    url, integrity = vendor_source(name)
+    return format_html('<script src="{}" integrity="{}" crossorigin="anonymous"></script>', url, integrity)
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import django.forms
+from django.apps import apps
+from django.forms.renderers import get_default_renderer
+from django.template import engines
+
+FORM_TEMPLATES = Path(django.forms.__file__).parent / 'templates'
+
+
+def _names(root, pattern):
+    return sorted(str(path.relative_to(root)) for path in root.glob(pattern))
+
+
+def precompile(pattern='core/**/*.html'):
+    """Parse every matching app template, and the form widget templates, into
+    the cached loaders so requests never touch the template files.
+    """
+    engine = engines['django']
+    root = Path(apps.get_app_config('core').path) / 'templates'
+    names = _names(root, pattern)
+    for name in names:
+        engine.get_template(name)
+    renderer = get_default_renderer()
+    widgets = _names(FORM_TEMPLATES, 'django/forms/**/*.html')
+    for name in widgets:
+        renderer.get_template(name)
+    return len(names) + len(widgets)
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    analytics, arrears, audit, benchmarks, caching, importers, invoicing, ledger, metrics, occupancy, receipts,
+    reconciliation, search, sessions, summaries,
+)
+from .backends import user_cache_key
+from .benchmarks import Measurement, regressions
+from .middleware import RequestMetricsMiddleware, StaticFilesMiddleware
+from .pagination import paginate
+from .models import ArrearsEntry, AuditEntry, Building, CustomUser, LateFeePolicy, RentLedger, RentPayment, Tenant, TenantSummary, Unit
+from .seeding import seed
+from .staticfiles import VENDOR_ASSETS, compress, vendor_source
+from .templating import precompile
+from .urls import PUBLIC, route_roles, urlpatterns
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_INLINE=True, AUTH_USER_CACHE_TIMEOUT=300)
+class RouteAuthorizationTests(TestCase):
+    methods = ('get', 'post', 'put', 'patch', 'delete')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            role: CustomUser.objects.create_user(
+                username=role, email=f'{role}@example.com', password='secret', name=role.title(), role=role,
+            )
+            for role in ('admin', 'tenant')
+        }
+        cls.building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.unit = Unit.objects.create(building=cls.building, unit_number='N-1', type='studio', rent_amount=1000)
+        cls.tenant = Tenant.objects.create(
+            name='Jane', phone='0700000000', email='jane@example.com', id_number='J-1', unit=cls.unit,
+        )
+        cls.payment = RentPayment.objects.create(
+            tenant=cls.tenant, unit=cls.unit, amount=1000, month=1, year=2025,
+            status='paid', payment_date='2025-01-05',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def url_for(self, pattern):
+        kwargs = {}
+        converters = pattern.pattern.converters
+        if 'pk' in converters:
+            objects = {'building': self.building, 'unit': self.unit, 'tenant': self.tenant, 'rent': self.payment}
+            kwargs['pk'] = objects[pattern.name.split('_')[0]].pk
+        if 'fmt' in converters:
+            kwargs['fmt'] = 'csv'
+        if 'source' in converters:
+            kwargs['source'] = 'units'
+        return reverse(pattern.name, kwargs=kwargs)
+
+    def request(self, method, url):
+        # Allowed requests may create or delete rows; keep every case isolated.
+        with transaction.atomic():
+            response = getattr(self.client, method)(url)
+            transaction.set_rollback(True)
+        return response
+
+    def test_every_route_has_roles(self):
+        self.assertEqual({pattern.name for pattern in urlpatterns}, set(route_roles))
+
+    def test_anonymous_requests(self):
+        for pattern in urlpatterns:
+            url = self.url_for(pattern)
+            for method in self.methods:
+                with self.subTest(route=pattern.name, method=method):
+                    if route_roles[pattern.name] is PUBLIC:
+                        self.assertNotIn(self.request(method, url).status_code, (401, 403))
+                        continue
+                    with self.assertNumQueries(0):
+                        response = getattr(self.client, method)(url)
+                    self.assertEqual(response.status_code, 302)
+                    self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    def test_role_requests(self):
+        home = {'admin': 'admin_dashboard', 'tenant': 'tenant_dashboard'}
+        for role, user in self.users.items():
+            self.client.force_login(user)
+            self.client.get(reverse(home[role]))  # warm the cached user
+            for pattern in urlpatterns:
+                roles = route_roles[pattern.name]
+                url = self.url_for(pattern)
+                for method in self.methods:
+                    with self.subTest(role=role, route=pattern.name, method=method):
+                        if roles is PUBLIC or role in roles:
+                            response = self.request(method, url)
+                            self.assertNotEqual(response.status_code, 403)
+                            self.assertFalse(response.get('Location', '').startswith(settings.LOGIN_URL)
+                                             and pattern.name != 'logout')
+                            if pattern.name == 'logout':
+                                self.client.force_login(user)
+                                self.client.get(reverse(home[role]))
+                            continue
+                        with CaptureQueriesContext(connection) as queries:
+                            response = getattr(self.client, method)(url)
+                        self.assertEqual(response.status_code, 403)
+                        self.assertEqual(
+                            [q['sql'] for q in queries if 'django_session' not in q['sql']], [],
+                            "A rejected request touched tables other than the session store.",
+                        )
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class OccupancyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.units = [
+            Unit.objects.create(building=building, unit_number=f'N-{i}', type='studio', rent_amount=1000) for i in range(3)
+        ]
+        cls.tenants = [
+            Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=cls.units[i])
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def statuses(self):
+        return list(Unit.objects.order_by('unit_number').values_list('status', flat=True))
+
+    def test_status_is_not_editable(self):
+        unit = self.units[2]
+        self.client.post(reverse('unit_update', args=[unit.pk]), {
+            'building': unit.building_id, 'unit_number': unit.unit_number, 'type': 'studio',
+            'rent_amount': '1200', 'status': 'occupied',
+        })
+        unit.refresh_from_db()
+        self.assertEqual((unit.rent_amount, unit.status), (1200, 'vacant'))
+
+    def test_move_api(self):
+        url = reverse('tenant_api_move')
+        first, second = self.tenants
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'moves': [
+                {'tenant': first.pk, 'unit': self.units[1].pk},
+                {'tenant': second.pk, 'unit': self.units[2].pk},
+            ]}, content_type='application/json')
+        self.assertEqual(response.json(), {'moved': 2})
+        self.assertEqual(self.statuses(), ['vacant', 'occupied', 'occupied'])
+        self.assertEqual(
+            audit.history('tenant', first.pk).filter(action='update').get().changes,
+            {'unit_id': [self.units[0].pk, self.units[1].pk]},
+        )
+
+        response = self.client.post(url, {'moves': [
+            {'tenant': first.pk, 'unit': self.units[0].pk}, {'tenant': second.pk, 'unit': self.units[0].pk},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Two tenants cannot be moved into the same unit.'})
+        self.assertEqual(self.client.post(url, {'moves': 'x'}, content_type='application/json').status_code, 400)
+
+        self.client.post(url, {'moves': [{'tenant': first.pk, 'unit': None}]}, content_type='application/json')
+        self.assertEqual(self.statuses(), ['vacant', 'vacant', 'occupied'])
+        self.assertEqual(occupancy.reconcile(), 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are asserted against SQLite's EXPLAIN QUERY PLAN.")
+class RentPaymentQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.unit = Unit.objects.create(building=building, unit_number='N-1', type='studio', rent_amount=1000)
+        cls.tenant = Tenant.objects.create(
+            name='Jane', phone='0700000000', email='jane@example.com', id_number='J-1', unit=cls.unit,
+        )
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIn('SEARCH core_rentpayment USING', plan)
+        self.assertNotIn('SCAN core_rentpayment', plan, f"Lookup fell back to a full scan:\n{plan}")
+
+    def test_arrears(self):
+        self.assertUsesIndex(RentPayment.objects.filter(status='unpaid').order_by('year', 'month', 'id'))
+
+    def test_period(self):
+        self.assertUsesIndex(RentPayment.objects.filter(year=2025, month=1))
+        self.assertUsesIndex(RentPayment.objects.filter(year=2025, month=1, status='paid'))
+
+    def test_tenant_history(self):
+        self.assertUsesIndex(RentPayment.objects.filter(tenant=self.tenant).order_by('-year', '-month'))
+
+    def test_unit_history(self):
+        self.assertUsesIndex(RentPayment.objects.filter(unit=self.unit, year=2025))
+
+    def test_receipt_lookup(self):
+        self.assertUsesIndex(RentPayment.objects.filter(receipt_number='REC-1-1-2025').exclude(receipt_number=''))
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.units = []
+        for name in ('North', 'South'):
+            building = Building.objects.create(name=name, location='Nairobi', type='apartment')
+            cls.units.append(Unit.objects.create(building=building, unit_number=f'{name}-1', type='studio', rent_amount=1000))
+        cls.tenant = Tenant.objects.create(name='Jane', phone='-', email='jane@example.com', id_number='J-1', unit=cls.units[0])
+
+    def assertLedgerMatchesRebuild(self):
+        rows = sorted(RentLedger.objects.filter(payment_count__gt=0).values_list(
+            'building_id', 'year', 'month', 'status', 'payment_count', 'total_amount',
+        ))
+        with transaction.atomic():
+            ledger.rebuild()
+            rebuilt = sorted(RentLedger.objects.values_list(
+                'building_id', 'year', 'month', 'status', 'payment_count', 'total_amount',
+            ))
+            transaction.set_rollback(True)
+        self.assertEqual(rows, rebuilt)
+
+    def test_incremental_updates_match_a_rebuild(self):
+        payments = [
+            RentPayment.objects.create(tenant=self.tenant, unit=self.units[0], amount=1000, year=2025, month=month)
+            for month in (1, 2)
+        ]
+        self.assertLedgerMatchesRebuild()
+        payment = RentPayment.objects.get(pk=payments[0].pk)
+        payment.status, payment.payment_date, payment.amount = 'paid', date(2025, 1, 3), 1200
+        payment.save()
+        self.assertLedgerMatchesRebuild()
+        payment.unit, payment.month = self.units[1], 3
+        payment.save()
+        self.assertLedgerMatchesRebuild()
+        payments[1].delete()
+        self.assertLedgerMatchesRebuild()
+        # Deleting a payment another request already deleted changes nothing.
+        payments[1].pk = RentPayment.objects.get().pk + 1
+        payments[1].delete()
+        self.assertLedgerMatchesRebuild()
+        self.assertEqual(RentLedger.objects.get(building=self.units[1].building, status='paid').total_amount, 1200)
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class TenantSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.units = [
+            Unit.objects.create(building=building, unit_number=f'N-{i}', type='studio', rent_amount=1000) for i in range(2)
+        ]
+        cls.tenants = [
+            Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit)
+            for i, unit in enumerate(cls.units)
+        ]
+
+    def summaries(self):
+        return {
+            row[0]: row[1:]
+            for row in TenantSummary.objects.order_by('tenant_id').values_list('tenant_id', *summaries.FIELDS)
+        }
+
+    def assertSummaries(self, expected):
+        # Tenants get a summary once a payment of theirs changes.
+        current = self.summaries()
+        self.assertEqual({pk: row[:4] for pk, row in current.items()}, {
+            self.tenants[i].pk: totals for i, totals in expected.items()
+        })
+        with transaction.atomic():
+            summaries.rebuild()
+            rebuilt = self.summaries()
+            transaction.set_rollback(True)
+        self.assertEqual(current, {pk: rebuilt[pk] for pk in current})
+
+    def test_payment_saves_and_deletes(self):
+        payment = RentPayment.objects.create(tenant=self.tenants[0], unit=self.units[0], amount=1000, year=2025, month=1)
+        self.assertSummaries({0: (0, 0, 1, 1000)})
+        payment.status, payment.payment_date = 'paid', date(2025, 1, 4)
+        payment.save()
+        self.assertSummaries({0: (1, 1000, 0, 0)})
+        self.assertEqual(TenantSummary.objects.get(pk=self.tenants[0].pk).last_payment_date, date(2025, 1, 4))
+        # Moving a payment refreshes the tenant it left as well.
+        payment.tenant = self.tenants[1]
+        payment.save()
+        self.assertSummaries({0: (0, 0, 0, 0), 1: (1, 1000, 0, 0)})
+        payment.delete()
+        self.assertSummaries({0: (0, 0, 0, 0), 1: (0, 0, 0, 0)})
+
+    def test_cascaded_deletes_refresh_on_commit(self):
+        RentPayment.objects.create(tenant=self.tenants[0], unit=self.units[1], amount=1000, year=2025, month=1)
+        RentPayment.objects.create(tenant=self.tenants[0], unit=self.units[0], amount=1200, year=2025, month=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.units[1].delete()
+        self.assertSummaries({0: (0, 0, 1, 1200)})
+
+    def test_dashboard_creates_a_missing_summary(self):
+        user = CustomUser.objects.create_user(
+            username='tenant', email='tenant@example.com', password='secret', name='Tenant', role='tenant',
+        )
+        Tenant.objects.filter(pk=self.tenants[0].pk).update(user=user)
+        RentPayment.objects.create(tenant=self.tenants[0], unit=self.units[0], amount=1000, year=2025, month=1)
+        TenantSummary.objects.all().delete()
+        self.client.force_login(user)
+        response = self.client.get(reverse('tenant_dashboard'))
+        self.assertEqual(response.context['summary'].outstanding_amount, 1000)
+        self.assertEqual(self.summaries()[self.tenants[0].pk][:4], (0, 0, 1, 1000))
+
+
+class InvoicingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.units = []
+        for name, rent in (('North', 1000), ('South', 1500)):
+            building = Building.objects.create(name=name, location='Nairobi', type='apartment')
+            cls.units += [
+                Unit.objects.create(building=building, unit_number=f'{name}-{i}', type='studio', rent_amount=rent)
+                for i in range(2)
+            ]
+        cls.tenants = [
+            Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit)
+            for i, unit in enumerate(cls.units[1:])
+        ]
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+
+    def ledger(self):
+        return sorted(RentLedger.objects.filter(payment_count__gt=0).values_list(
+            'building__name', 'year', 'month', 'status', 'payment_count', 'total_amount',
+        ))
+
+    def test_rerun_skips_invoiced_periods(self):
+        RentPayment.objects.create(tenant=self.tenants[0], unit=self.units[1], amount=1000, year=2025, month=6)
+        run = invoicing.generate_invoices(2025, 6, batch_size=1)
+        self.assertEqual((run.created, run.skipped), (2, 1))
+        self.assertEqual(self.ledger(), [
+            ('North', 2025, 6, 'unpaid', 1, 1000),
+            ('South', 2025, 6, 'unpaid', 2, 3000),
+        ])
+        self.assertEqual(
+            list(TenantSummary.objects.order_by('tenant_id').values_list('unpaid_count', 'outstanding_amount')),
+            [(1, 1000), (1, 1500), (1, 1500)],
+        )
+
+        run = invoicing.generate_invoices(2025, 6)
+        self.assertEqual((run.created, run.skipped), (0, 3))
+        self.assertEqual(RentPayment.objects.filter(year=2025, month=6).count(), 3)
+        self.assertEqual(self.ledger()[1][4:], (2, 3000))
+
+    def test_admin_action_and_command(self):
+        today = timezone.localdate()
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:core_unit_changelist'), {
+            'action': 'generate_current_invoices', '_selected_action': [self.units[1].pk, self.units[2].pk],
+        }, follow=True)
+        self.assertContains(response, f'Created 2 invoices for {today.month}/{today.year} (0 already existed)')
+        self.assertEqual(
+            set(RentPayment.objects.values_list('unit_id', 'year', 'month')),
+            {(self.units[1].pk, today.year, today.month), (self.units[2].pk, today.year, today.month)},
+        )
+
+        stdout = io.StringIO()
+        call_command('generate_invoices', year=today.year, month=today.month, stdout=stdout)
+        self.assertIn(f'Created 1 invoices for {today.month}/{today.year} (2 already existed)', stdout.getvalue())
+        with self.assertRaisesMessage(CommandError, 'Month must be between 1 and 12.'):
+            call_command('generate_invoices', month=13)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Building search uses the FTS5 index on SQLite.")
+class UnitSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.riverside = Building.objects.create(name='Riverside Court', location='Nairobi West', type='apartment')
+        cls.cafe = Building.objects.create(name='Café Azure', location='Mombasa', type='apartment')
+        for building in (cls.riverside, cls.cafe):
+            for i in range(2):
+                Unit.objects.create(building=building, unit_number=f'{building.pk}-{i}', type='studio', rent_amount=1000 + i)
+
+    def test_words_match_name_and_location_prefixes(self):
+        self.assertEqual(search.matching_buildings('river nair'), [self.riverside.pk])
+        self.assertEqual(search.matching_buildings('CAFE'), [self.cafe.pk])
+        self.assertEqual(search.matching_buildings('river mombasa'), [])
+        # FTS5 syntax in the input is quoted away rather than interpreted.
+        self.assertEqual(search.matching_buildings('"*) OR ('), [])
+        self.assertIsNone(search.matching_buildings('"*)('))
+
+    def test_triggers_keep_the_index_current(self):
+        Building.objects.filter(pk=self.riverside.pk).update(name='Lakeside Court')
+        self.assertEqual(search.matching_buildings('river'), [])
+        self.assertEqual(search.matching_buildings('lakeside'), [self.riverside.pk])
+        Building.objects.filter(pk=self.cafe.pk).delete()
+        self.assertEqual(search.matching_buildings('azure'), [])
+        building = Building.objects.create(name='Azure Heights', location='Kisumu', type='apartment')
+        self.assertEqual(search.matching_buildings('azure'), [building.pk])
+
+    def test_search_units_filters_by_text(self):
+        result = search.search_units(text='riverside')
+        self.assertEqual([unit.building_id for unit in result.page], [self.riverside.pk] * 2)
+        self.assertEqual(result.total, 2)
+        self.assertEqual(result.building_facets, [{'building': self.riverside.pk, 'name': 'Riverside Court', 'count': 2}])
+        self.riverside.name = 'Lakeside Court'
+        self.riverside.save()
+        self.assertEqual(search.search_units(text='riverside').total, 0)
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Alpha', 'Bravo', 'Charlie'):
+            Building.objects.create(name=name, location='Nairobi', type='apartment')
+
+    def page(self, cursor):
+        return paginate(Building.objects.all(), ('name', 'id'), cursor, 2)
+
+    def test_cursors(self):
+        first = self.page(None)
+        with self.assertNumQueries(1):
+            second = self.page(first.next_cursor)
+        self.assertEqual([building.name for building in second], ['Charlie'])
+        self.assertEqual([building.name for building in self.page(second.previous_cursor)], ['Alpha', 'Bravo'])
+
+    def test_tampered_cursor_starts_over(self):
+        for values in (['x', 'abc'], ['x', '9' * 30], ['x', None], ['x'], 'x'):
+            with self.subTest(values=values):
+                cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'd': 'next'}).encode()).decode()
+                with self.assertNumQueries(1):
+                    page = self.page(cursor)
+                self.assertEqual([building.name for building in page], ['Alpha', 'Bravo'])
+                self.assertFalse(page.has_previous())
+
+
+class ArrearsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.buildings = [
+            Building.objects.create(name=name, location='Nairobi', type='apartment') for name in ('North', 'South')
+        ]
+        LateFeePolicy.objects.create(
+            building=cls.buildings[0], due_day=5, grace_days=2, flat_fee=100, daily_rate=1, max_fee=400,
+        )
+        cls.tenants = []
+        for i, building in enumerate(cls.buildings):
+            unit = Unit.objects.create(building=building, unit_number=f'U-{i}', type='studio', rent_amount=1000)
+            tenant = Tenant.objects.create(
+                name=f'Tenant {i}', phone='0700000000', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit,
+            )
+            cls.tenants.append(tenant)
+            for month in (1, 2, 3):
+                RentPayment.objects.create(tenant=tenant, unit=unit, amount=1000, year=2025, month=month)
+        RentPayment.objects.filter(tenant=cls.tenants[1], month=1).update(status='paid', payment_date='2025-02-20')
+
+    def entries(self, as_of):
+        return list(ArrearsEntry.objects.filter(as_of=as_of).order_by('tenant_id', 'due_date').values_list(
+            'tenant__name', 'due_date', 'days_overdue', 'late_fee',
+        ))
+
+    def test_evaluate(self):
+        run = arrears.evaluate(date(2025, 2, 12))
+        self.assertEqual(run.entries, 4)
+        self.assertEqual(self.entries(date(2025, 2, 12)), [
+            ('Tenant 0', date(2025, 1, 5), 38, 400),  # capped
+            ('Tenant 0', date(2025, 2, 5), 7, 150),  # 100 + 1% of 1000 for 5 days past grace
+            ('Tenant 1', date(2025, 1, 1), 42, 0),  # paid after this date
+            ('Tenant 1', date(2025, 2, 1), 11, 0),
+        ])
+
+    def test_reevaluating_replaces_snapshot(self):
+        arrears.evaluate(date(2025, 2, 12))
+        RentPayment.objects.filter(tenant=self.tenants[0]).update(status='paid', payment_date='2025-02-01')
+        arrears.evaluate(date(2025, 2, 12))
+        self.assertEqual([row[0] for row in self.entries(date(2025, 2, 12))], ['Tenant 1', 'Tenant 1'])
+        owing = arrears.tenants_owing(date(2025, 2, 12)).get()
+        self.assertEqual((owing, owing.owed, owing.periods, owing.days_overdue), (self.tenants[1], 2000, 2, 42))
+        self.assertEqual(arrears.tenants_owing(date(2025, 2, 12), self.buildings[0]).count(), 0)
+
+    def test_report_only_evaluates_on_post(self):
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        self.client.force_login(admin)
+        for params in ({'as_of': '2025-02-12'}, {}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('arrears_report'), params)
+                self.assertContains(response, 'Evaluate arrears')
+                self.assertFalse(ArrearsEntry.objects.exists())
+
+        response = self.client.post(reverse('arrears_report'), {'as_of': '2025-02-12', 'building': self.buildings[0].pk})
+        self.assertRedirects(response, f"{reverse('arrears_report')}?as_of=2025-02-12&building={self.buildings[0].pk}")
+        self.assertEqual(ArrearsEntry.objects.filter(as_of=date(2025, 2, 12)).count(), 4)
+        response = self.client.get(reverse('arrears_report'), {'as_of': '2025-02-12'})
+        self.assertEqual([tenant.name for tenant in response.context['tenants']], ['Tenant 0', 'Tenant 1'])
+
+
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        Unit.objects.create(building=building, unit_number='N-1', type='studio', rent_amount=1000)
+
+    def csv(self, *lines):
+        return io.BytesIO('\n'.join(lines).encode())
+
+    def test_rows_are_validated_one_by_one(self):
+        result = importers.import_file('units', self.csv(
+            'building,unit_number,type,rent_amount', 'North,N-2,studio,900', 'North,N-1,studio,900',
+            'South,S-1,studio,900', 'North,N-2,studio,900', 'North,N-3,studio,lots',
+        ), 'units.csv')
+        self.assertEqual((result.rows, result.created), (5, 1))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 6])
+
+    def test_conflicting_batch_falls_back_to_single_rows(self):
+        prefetch = importers.TenantImporter.prefetch
+
+        def racing_prefetch(importer, rows):
+            # Another request takes an email after the importer looked.
+            prefetch(importer, rows)
+            Tenant.objects.get_or_create(email='taken@example.com', defaults={'name': 'Racer', 'phone': '-', 'id_number': 'R-1'})
+
+        with mock.patch.object(importers.TenantImporter, 'prefetch', racing_prefetch):
+            result = importers.import_file('tenants', self.csv(
+                'name,phone,email,id_number,unit', 'A,-,taken@example.com,T-1,N-1', 'B,-,b@example.com,T-2,',
+                'C,-,c@example.com,T-3,N-1',
+            ), 'tenants.csv', batch_size=2)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [2])
+        # The failed row's unit was released for the next batch.
+        self.assertEqual(Tenant.objects.get(unit__unit_number='N-1').email, 'c@example.com')
+        self.assertEqual(Unit.objects.get(unit_number='N-1').status, 'occupied')
+
+    def test_invalid_workbook(self):
+        with self.assertRaisesMessage(ValueError, 'not a valid .xlsx workbook'):
+            importers.import_file('buildings', io.BytesIO(b'not a workbook'), 'buildings.xlsx')
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        unit = Unit.objects.create(building=building, unit_number='N-1', type='studio', rent_amount=1000)
+        tenant = Tenant.objects.create(name='Jane, Doe', phone='-', email='jane@example.com', id_number='J-1', unit=unit)
+        for month in (1, 2, 3):
+            RentPayment.objects.create(tenant=tenant, unit=unit, amount=1000, year=2025, month=month)
+        RentPayment.objects.filter(month=2).update(status='paid', payment_date=date(2025, 2, 3))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, content = self.export(reverse('rent_payment_export', args=['csv']), {'sort': 'period'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="payments.csv"')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][:3], ['id', 'tenant', 'tenant_id_number'])
+        self.assertEqual([(row[1], row[7], row[8], row[9]) for row in rows[1:]], [
+            ('Jane, Doe', '1', 'unpaid', ''),
+            ('Jane, Doe', '2', 'paid', '2025-02-03'),
+            ('Jane, Doe', '3', 'unpaid', ''),
+        ])
+
+    def test_jsonl_applies_filters(self):
+        response, content = self.export(reverse('rent_payment_export', args=['jsonl']), {'status': 'unpaid'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['month'], row['status'], row['amount']) for row in rows], [
+            (3, 'unpaid', '1000.00'), (1, 'unpaid', '1000.00'),
+        ])
+        _, content = self.export(reverse('unit_export', args=['jsonl']), {'status': 'vacant'})
+        self.assertEqual(content, '')
+
+    def test_unknown_format_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('tenant_export', args=['xlsx'])).status_code, 404)
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class TenantPhotoTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 200), 'teal').save(buffer, 'PNG')
+        return SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+
+    def create_tenant(self):
+        return Tenant.objects.create(name='Jane', phone='-', email='jane@example.com', id_number='J-1', profile_photo=self.upload())
+
+    def test_photo_is_written_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            tenant = self.create_tenant()
+        self.assertFalse((self.media_root / tenant.profile_photo.name).exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue((self.media_root / tenant.profile_photo.name).exists())
+        tenant.refresh_from_db()
+        self.assertTrue(tenant.profile_thumbnails['small']['webp'].endswith('_64.webp'))
+
+    def test_thumbnails_fall_back_to_the_original(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            tenant = self.create_tenant()
+        self.assertEqual(tenant.profile_thumbnails['large'], {'webp': tenant.profile_photo.url, 'jpg': tenant.profile_photo.url})
+        version = caching.versions([Tenant])
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caching.versions([Tenant]), version)
+        tenant.refresh_from_db()
+        # Whether the thumbnails exist is stored on the row, not looked up on each render.
+        with mock.patch('django.core.files.storage.default_storage.exists', side_effect=AssertionError("exists()")):
+            self.assertTrue(tenant.profile_thumbnails['large']['jpg'].endswith('_256.jpg'))
+
+    def test_rollback_leaves_no_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_tenant()
+                transaction.set_rollback(True)
+        self.assertEqual(list(self.media_root.rglob('*.*')), [])
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class ReconciliationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.tenants = []
+        for i in range(2):
+            unit = Unit.objects.create(building=building, unit_number=f'N-{i}', type='studio', rent_amount=1000)
+            tenant = Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit)
+            cls.tenants.append(tenant)
+            for month in (1, 2, 3):
+                RentPayment.objects.create(tenant=tenant, unit=unit, amount=1000 + 500 * i, year=2025, month=month)
+
+    def ledger_rows(self):
+        return sorted(RentLedger.objects.filter(payment_count__gt=0).values_list(
+            'building_id', 'year', 'month', 'status', 'payment_count', 'total_amount',
+        ))
+
+    def payment(self, tenant, month):
+        return RentPayment.objects.get(tenant=tenant, month=month)
+
+    def test_mark_paid(self):
+        first, second = self.payment(self.tenants[0], 1), self.payment(self.tenants[0], 2)
+        # A hand-entered receipt already uses the number the first payment would get.
+        RentPayment.objects.filter(pk=self.payment(self.tenants[1], 3).pk).update(receipt_number=f'REC-{first.tenant_id}-1-2025')
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = reconciliation.mark_paid({first.pk: date(2025, 1, 3), second.pk: date(2025, 2, 4)}, batch_size=1)
+        self.assertEqual(len(updated), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.payment_date, first.receipt_number), ('paid', date(2025, 1, 3), f'REC-{first.tenant_id}-1-2025-{first.pk}'))
+        self.assertEqual((second.status, second.receipt_number), ('paid', f'REC-{second.tenant_id}-2-2025'))
+        self.assertEqual(reconciliation.mark_paid({first.pk: date(2025, 1, 5)}), [])
+
+        rows = self.ledger_rows()
+        ledger.rebuild()
+        self.assertEqual(rows, self.ledger_rows())
+        self.assertEqual(self.tenants[0].summary.paid_count, 2)
+        self.assertEqual(audit.history('rentpayment', second.pk).filter(action='update').get().changes['status'], ['unpaid', 'paid'])
+
+    def test_mark_paid_commits_each_batch(self):
+        first, second = self.payment(self.tenants[0], 1), self.payment(self.tenants[0], 2)
+        assign_receipts = reconciliation.assign_receipts
+
+        def fail_second_batch(payments):
+            if payments[0].pk == second.pk:
+                raise RuntimeError("Lost the database connection.")
+            return assign_receipts(payments)
+
+        with mock.patch.object(reconciliation, 'assign_receipts', fail_second_batch), self.assertRaises(RuntimeError):
+            reconciliation.mark_paid({first.pk: date(2025, 1, 3), second.pk: date(2025, 2, 4)}, batch_size=1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('paid', 'unpaid'))
+        rows = self.ledger_rows()
+        ledger.rebuild()
+        self.assertEqual(rows, self.ledger_rows())
+
+    def test_reconcile_statement(self):
+        statement = (
+            'Date,Amount,Reference,Period\n'
+            '2025-03-01,1000,T-0,2025-02\n'
+            '2025-03-01,1500,t1@example.com,\n'
+            '2025-03-02,1500,T-1,\n'
+            '2025-03-02,1000,T-0,2025-02\n'
+            '2025-03-03,999,T-0,\n'
+            '2025-03-03,1000,nobody,\n'
+            'soon,1000,T-0,\n'
+        )
+        result = reconciliation.reconcile_file(io.BytesIO(statement.encode()), 'statement.csv')
+        self.assertEqual((result.lines, result.matched), (7, 3))
+        self.assertEqual([(line, reason) for line, _, _, reason in result.unmatched], [
+            (5, 'No unpaid payment of 1000 for 2025-02.'),
+            (6, 'No unpaid payment of 999.'),
+            (7, "No tenant with ID number or email 'nobody'."),
+            (8, 'date: Enter a valid date.'),
+        ])
+        self.assertEqual(
+            sorted(RentPayment.objects.filter(status='paid').values_list('tenant__id_number', 'month', 'payment_date')),
+            [('T-0', 2, date(2025, 3, 1)), ('T-1', 1, date(2025, 3, 1)), ('T-1', 2, date(2025, 3, 2))],
+        )
+
+    def test_mark_paid_view(self):
+        self.client.force_login(self.admin)
+        payments = RentPayment.objects.filter(tenant=self.tenants[1])
+        response = self.client.post(reverse('rent_payment_mark_paid'), {
+            'payments': list(payments.values_list('pk', flat=True)), 'payment_date': '2025-04-01',
+        })
+        self.assertRedirects(response, reverse('rent_payment_list'), fetch_redirect_response=False)
+        self.assertEqual(set(payments.values_list('status', 'payment_date')), {('paid', date(2025, 4, 1))})
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class ReceiptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        cls.users, cls.payments = [], []
+        for i in range(2):
+            user = CustomUser.objects.create_user(
+                username=f'tenant{i}', email=f't{i}@example.com', password='secret', name=f'T{i}', role='tenant',
+            )
+            unit = Unit.objects.create(building=building, unit_number=f'N-{i}', type='studio', rent_amount=1000)
+            tenant = Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit, user=user)
+            cls.users.append(user)
+            cls.payments.append(RentPayment.objects.create(
+                tenant=tenant, unit=unit, amount=1000, year=2025, month=1, status='paid', payment_date=date(2025, 1, 3),
+            ))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def download(self, pk):
+        response = self.client.get(reverse('tenant_payment_receipt', args=[pk]))
+        content = b''.join(response.streaming_content) if response.status_code == 200 else b''
+        response.close()
+        return response, content
+
+    def test_pdf_is_rendered_once_and_reused(self):
+        self.client.force_login(self.users[0])
+        payment = RentPayment.objects.select_related('tenant', 'unit__building').get(pk=self.payments[0].pk)
+        with mock.patch.object(receipts, 'render_pdf', wraps=receipts.render_pdf) as render:
+            response, content = self.download(payment.pk)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(content.startswith(b'%PDF'))
+            path = self.media_root / receipts.receipt_name(receipts.receipt_data(payment))
+            self.assertEqual(path.read_bytes(), content)
+            self.assertEqual(self.download(payment.pk)[1], content)
+            self.assertEqual(render.call_count, 1)
+
+            # Changing what the receipt shows renders a new file.
+            payment.amount = 1200
+            with self.captureOnCommitCallbacks(execute=True):
+                payment.save()
+            self.assertEqual(render.call_count, 2)
+            payment.refresh_from_db()
+            self.assertTrue((self.media_root / receipts.receipt_name(receipts.receipt_data(payment))).exists())
+            self.assertEqual(self.download(payment.pk)[1][:4], b'%PDF')
+            self.assertEqual(render.call_count, 2)
+
+    def test_tenants_only_get_their_own_receipts(self):
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.download(self.payments[1].pk)[0].status_code, 404)
+        self.assertFalse(any(self.media_root.rglob('*.pdf')))
+
+class AnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        cls.building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        units = [
+            Unit.objects.create(building=cls.building, unit_number=f'N-{i}', type='studio', rent_amount=1000)
+            for i in range(4)
+        ]
+        for i, unit in enumerate(units[:2]):
+            tenant = Tenant.objects.create(name=f'T{i}', phone='-', email=f't{i}@example.com', id_number=f'T-{i}', unit=unit)
+            for month in (11, 12):
+                paid = i == 0 or month == 11
+                RentPayment.objects.create(
+                    tenant=tenant, unit=unit, amount=1000, year=2024, month=month,
+                    status='paid' if paid else 'unpaid', payment_date='2024-12-01' if paid else None,
+                )
+
+    def test_series(self):
+        data = analytics.compute(2024 * 12 + 9, 2025 * 12, self.building)
+        self.assertEqual(data['labels'], ['2024-10', '2024-11', '2024-12', '2025-01'])
+        self.assertEqual(data['units'], 4)
+        self.assertEqual(data['series'], {
+            'rent_roll': [0, 2000, 2000, 0],
+            'collected': [0, 2000, 1000, 0],
+            'outstanding': [0, 0, 1000, 0],
+            'collection_rate': [None, 1.0, 0.5, None],
+            'collection_rate_3m': [None, 1.0, 0.75, 0.75],
+            'occupied_units': [0, 2, 2, 0],
+            'occupancy_rate': [0.0, 0.5, 0.5, 0.0],
+        })
+
+    def test_exports_are_cached(self):
+        self.client.force_login(self.admin)
+        url = reverse('analytics_export', args=['csv']) + '?start=2024-11&end=2024-12'
+        self.assertEqual(self.client.get(url).content.decode().splitlines(), [
+            'month,rent_roll,collected,outstanding,collection_rate,collection_rate_3m,occupied_units,occupancy_rate',
+            '2024-11,2000.0,2000.0,0.0,1.0,1.0,2,0.5',
+            '2024-12,2000.0,1000.0,1000.0,0.5,0.75,2,0.5',
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([q for q in queries if 'core_rent' in q['sql'] or 'core_unit' in q['sql']])
+        response = self.client.get(reverse('analytics_export', args=['json']) + '?start=2025-01&end=2024-01')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class AuditLogTests(TestCase):
+    def changes(self):
+        return list(AuditEntry.objects.order_by('id').values_list('model', 'action', 'changes'))
+
+    def test_field_diffs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = Building.objects.create(name='North', location='Nairobi', type='apartment').pk
+        with self.captureOnCommitCallbacks(execute=True):
+            building = Building.objects.get()
+            building.location = 'Mombasa'
+            building.save()
+            building.save()  # unchanged, not logged
+        with self.captureOnCommitCallbacks(execute=True):
+            building.delete()
+        values = {'id': pk, 'name': 'North', 'type': 'apartment', 'description': ''}
+        self.assertEqual(self.changes(), [
+            ('building', 'create', {**values, 'location': 'Nairobi'}),
+            ('building', 'update', {'location': ['Nairobi', 'Mombasa']}),
+            ('building', 'delete', {**values, 'location': 'Mombasa'}),
+        ])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Building.objects.create(name='North', location='Nairobi', type='apartment')
+                transaction.set_rollback(True)
+        self.assertFalse(AuditEntry.objects.exists())
+
+    def test_buffered_writes(self):
+        log = audit.AuditLog(batch_size=2)
+        log.buffer.extend(
+            AuditEntry(timestamp='2025-01-01T00:00Z', model='unit', object_id=i, action='create', changes={})
+            for i in range(5)
+        )
+        with override_settings(BACKGROUND_TASKS_INLINE=False), self.assertNumQueries(3):
+            log.flush()
+        self.assertEqual(AuditEntry.objects.count(), 5)
+        self.assertEqual(list(audit.history('unit', 3)), [AuditEntry.objects.get(object_id=3)])
+        with self.assertRaises(ValueError):
+            AuditEntry.objects.first().delete()
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class AsyncAPITests(TransactionTestCase):
+    """Async API views through the full middleware stack; on_commit runs for real."""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+
+    async def request(self, method, url, data=None):
+        if data is not None:
+            data = json.dumps(data)
+        kwargs = {'content_type': 'application/json'} if data is not None else {}
+        return await asyncio.wait_for(getattr(self.async_client, method)(url, data, **kwargs), timeout=10)
+
+    async def test_writes_are_attributed_to_the_user(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.request('get', reverse('building_api_list'))
+        self.assertEqual(response.status_code, 200)
+        response = await self.request('post', reverse('building_api_list'), {'name': 'North', 'location': 'Nairobi', 'type': 'apartment'})
+        self.assertEqual(response.status_code, 201)
+        entry = await AuditEntry.objects.aget(model='building')
+        self.assertEqual((entry.action, entry.user_id), ('create', self.admin.pk))
+
+    async def test_writes_need_the_csrf_token(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        await client.aforce_login(self.admin)
+        token = 'a' * 32
+        client.cookies['csrftoken'] = token
+        url = reverse('building_api_list')
+        data = json.dumps({'name': 'North', 'location': 'Nairobi', 'type': 'apartment'})
+        response = await asyncio.wait_for(client.post(url, data, content_type='application/json'), timeout=10)
+        self.assertEqual(response.status_code, 403)
+        response = await asyncio.wait_for(
+            client.post(url, data, content_type='application/json', headers={'X-CSRFToken': token}), timeout=10,
+        )
+        self.assertEqual(response.status_code, 201)
+
+    async def test_list_follows_cursors(self):
+        for name in ('Delta', 'Alpha', 'Echo', 'Charlie', 'Bravo'):
+            await Building.objects.acreate(name=name, location='Nairobi', type='apartment')
+        await self.async_client.aforce_login(self.admin)
+        names, cursor = [], None
+        for _ in range(3):
+            params = {'ordering': 'name', 'limit': 2, 'fields': 'id,name', **({'cursor': cursor} if cursor else {})}
+            response = await asyncio.wait_for(self.async_client.get(reverse('building_api_list'), params), timeout=10)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertTrue(all(set(row) == {'id', 'name'} for row in data['results']))
+            names += [row['name'] for row in data['results']]
+            cursor = data['next_cursor']
+        self.assertEqual(names, ['Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo'])
+        self.assertIsNone(cursor)
+
+    async def test_status_codes_and_errors(self):
+        building = await Building.objects.acreate(name='North', location='Nairobi', type='apartment')
+        await self.async_client.aforce_login(self.admin)
+        url = reverse('building_api_list')
+
+        response = await self.request('get', reverse('building_api_detail', args=[building.pk]))
+        self.assertEqual((response.status_code, response.json()['name']), (200, 'North'))
+        response = await self.request('get', reverse('building_api_detail', args=[building.pk + 1]))
+        self.assertEqual((response.status_code, response.json()), (404, {'error': 'Not found.'}))
+        self.assertEqual((await self.request('delete', url)).status_code, 405)
+
+        for query, message in (
+            ('ordering=bogus', 'Ordering must be one of: id, name.'),
+            ('limit=many', 'limit must be an integer.'),
+            ('fields=id,bogus', 'Unknown fields: bogus.'),
+            ('cursor=bogus', 'Invalid cursor.'),
+            ('cursor=' + base64.urlsafe_b64encode(b'{"v":["abc"],"d":"next"}').decode(), 'Invalid cursor.'),
+        ):
+            with self.subTest(query=query):
+                response = await self.request('get', f'{url}?{query}')
+                self.assertEqual((response.status_code, response.json()), (400, {'error': message}))
+
+        response = await self.request('post', url, [{'name': 'South', 'location': 'Nairobi', 'type': 'apartment'}, {'location': 'Nairobi'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'No objects were saved.')
+        self.assertEqual(set(response.json()['errors']), {'1'})
+        self.assertIn('name', response.json()['errors']['1'])
+        self.assertEqual(await Building.objects.acount(), 1)
+
+        response = await self.request('patch', url, {'location': 'Mombasa'})
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Every object in an update needs an integer id.'}))
+        response = await self.request('patch', url, {'id': building.pk, 'location': 'Mombasa'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['location'], 'Mombasa')
+        self.assertEqual(response.json()['results'][0]['name'], 'North')
+
+
+class AuthBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def test_model_backend_sessions_stay_logged_in(self):
+        self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+
+    def test_per_process_cache_keeps_no_users(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+        self.assertIsNone(cache.get(user_cache_key(self.admin.pk)))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=300)
+    def test_saves_evict_the_cached_user(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+        self.assertIsNotNone(cache.get(user_cache_key(self.admin.pk)))
+
+        self.admin.role = 'tenant'
+        self.admin.save()
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 403)
+
+        self.admin.is_active = False
+        self.admin.save()
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('admin_dashboard')}", fetch_redirect_response=False)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', AUTH_USER_CACHE_TIMEOUT=300)
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        seed(buildings=2, units_per_building=30, occupancy=0.5, years=1, today=date(2025, 6, 1))
+        cls.tenant = Tenant.objects.exclude(unit=None).first()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_dashboard'))  # warm the cached user
+
+    def test_forms_render_only_the_selected_option(self):
+        payment = RentPayment.objects.filter(tenant=self.tenant).first()
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('rent_payment_update', args=[payment.pk]))
+        self.assertContains(response, '<option', count=2 + 2 + 13 + 2)  # tenant, unit, month, status
+        self.assertContains(response, 'data-autocomplete="/lookups/units/"')
+
+    def test_assign_form_offers_only_vacant_units(self):
+        occupied = Unit.objects.filter(status='occupied').exclude(pk=self.tenant.unit_id).first()
+        vacant = Unit.objects.filter(status='vacant').first()
+        url = reverse('tenant_assign', args=[self.tenant.pk])
+        self.assertContains(self.client.post(url, {'unit': occupied.pk}), 'Select a valid choice')
+        self.assertRedirects(self.client.post(url, {'unit': vacant.pk}), reverse('tenant_list'))
+        results = self.client.get(reverse('lookup', args=['vacant-units'])).json()['results']
+        self.assertNotIn(vacant.pk, [row['id'] for row in results])
+        self.assertEqual(len(results), 20)
+
+    def test_invalid_pk_is_a_form_error(self):
+        response = self.client.post(reverse('rent_payment_create'), {'tenant': 'abc', 'unit': '1e9999'})
+        self.assertContains(response, 'Select a valid choice', count=2)
+
+    def test_lookup_pages(self):
+        url = reverse('lookup', args=['units'])
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 40)
+        self.assertEqual(self.client.get(url, {'q': 'no such unit'}).json(), {'results': [], 'next_cursor': None})
+
+
+PRODUCTION_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'context_processors': settings.TEMPLATES[0]['OPTIONS']['context_processors'],
+        'loaders': [('django.template.loaders.cached.Loader', ['django.template.loaders.app_directories.Loader'])],
+    },
+}]
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class SessionCleanupTests(TestCase):
+    def test_clear_expired_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i:025}', session_data='', expire_date=now - timedelta(days=1)) for i in range(5)
+        ] + [Session(session_key=f'live{i:028}', session_data='', expire_date=now + timedelta(days=1)) for i in range(2)])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(sessions.clear_expired(batch_size=2), 5)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertEqual(sum('DELETE' in query['sql'] for query in queries), 3)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_have_nothing_to_clear(self):
+        self.assertEqual(sessions.clear_expired(), 0)
+
+
+class ProductionTemplateTests(TestCase):
+    @override_settings(TEMPLATES=PRODUCTION_TEMPLATES)
+    def test_precompiled_pages_read_no_template_files(self):
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        self.assertGreater(precompile(), 30)
+        self.client.force_login(admin)
+        with mock.patch.object(FilesystemLoader, 'get_contents', side_effect=AssertionError("template read")):
+            for name in ('admin_dashboard', 'unit_list', 'rent_payment_create', 'tenant_create', 'arrears_report'):
+                with self.subTest(route=name):
+                    self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_vendor_assets_are_served_locally(self):
+        css = 'core/vendor/bootstrap/bootstrap.min.css'
+        cdn, integrity = VENDOR_ASSETS[css]
+        vendor_source.cache_clear()
+        for _ in range(2):
+            response = self.client.get(reverse('login'))
+            self.assertContains(response, f'<link href="/static/{css}" rel="stylesheet" integrity="{integrity}" crossorigin="anonymous">')
+        # Every asset is resolved once, not on each render.
+        self.assertEqual(vendor_source.cache_info()[:2], (len(VENDOR_ASSETS), len(VENDOR_ASSETS)))
+
+        with override_settings(VENDOR_ASSETS_CDN=True):
+            self.assertContains(self.client.get(reverse('login')), f'<link href="{cdn}" rel="stylesheet"')
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+        Building.objects.create(name='North', location='Nairobi', type='apartment')
+
+    def setUp(self):
+        cache.clear()
+        for counter in caching.stats.values():
+            counter.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.admin)
+
+    def test_conditional_get(self):
+        url = reverse('building_list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+        # Another query string is another page.
+        self.assertEqual(self.client.get(url, {'page': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        Building.objects.create(name='South', location='Nairobi', type='apartment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_saves_invalidate_fragments(self):
+        url = reverse('building_list')
+        self.client.get(url)
+        with self.assertNumQueries(2):  # session and user only
+            response = self.client.get(url)
+        self.assertContains(response, 'North')
+        building = Building.objects.get()
+        building.name = 'Northgate'
+        building.save()
+        self.assertContains(self.client.get(url), 'Northgate')
+        self.assertEqual((caching.stats['hit']['building_list'], caching.stats['miss']['building_list']), (1, 2))
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('core_fragment_cache_requests_total{fragment="building_list",outcome="hit"} 1', body)
+        self.assertIn('core_fragment_cache_requests_total{fragment="building_list",outcome="miss"} 2', body)
+
+    def test_cached_builds_once_per_version(self):
+        build = mock.Mock(return_value='value')
+        self.assertEqual(caching.cached('test', (Unit,), 'a', build), 'value')
+        self.assertEqual(caching.cached('test', (Unit,), 'a', build), 'value')
+        caching.cached('test', (Unit,), 'b', build)
+        caching.bump(Unit)
+        caching.cached('test', (Unit,), 'a', build)
+        self.assertEqual(build.call_count, 3)
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', name='Admin', role='admin',
+        )
+
+    def setUp(self):
+        metrics.histograms.reset()
+        self.addCleanup(metrics.histograms.reset)
+        self.client.force_login(self.admin)
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('admin_dashboard')))
+        self.assertEqual(metrics.histograms.snapshot(), {})
+
+    @override_settings(REQUEST_METRICS=True, REQUEST_METRICS_N_PLUS_ONE=None)
+    def test_requests_are_timed(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[\d.]+;desc="{len(queries)} queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        [(elapsed, count, sql_time, template_time)] = metrics.histograms.snapshot()['admin_dashboard']
+        self.assertEqual(count, len(queries))
+        self.assertGreater(template_time, 0)
+        self.assertGreaterEqual(elapsed, sql_time + template_time)
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('core_request_queries_count{route="admin_dashboard"} 1', body)
+        self.assertIn('core_request_queries_bucket{route="admin_dashboard",le="+Inf"} 1', body)
+
+    @override_settings(REQUEST_METRICS=True, REQUEST_METRICS_N_PLUS_ONE=2)
+    def test_repeated_queries_are_logged(self):
+        building = Building.objects.create(name='North', location='Nairobi', type='apartment')
+        for i in range(3):
+            Unit.objects.create(building=building, unit_number=f'N-{i}', type='studio', rent_amount=1000)
+
+        def per_row_lookups(request):
+            for unit in Unit.objects.order_by('pk'):
+                Unit.objects.filter(pk__in=[unit.pk, unit.pk + 1]).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/units/')
+        request.resolver_match = None
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            RequestMetricsMiddleware(per_row_lookups)(request)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('3 queries shaped like', logs.output[0])
+        self.assertIn('IN (...)', logs.output[0])
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    def test_serves_precompressed_files(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        (root / 'app.abc123.css').write_text('body { margin: 0; }\n' * 100)
+        compress(root / 'app.abc123.css')
+        hashed = mock.patch('core.middleware.StaticFilesMiddleware.hashed_names', return_value={'app.abc123.css'})
+        with override_settings(STATIC_SERVE=True, STATIC_ROOT=root), hashed:
+            middleware = StaticFilesMiddleware(lambda request: None)
+        request = RequestFactory().get('/static/app.abc123.css', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertLess(int(response['Content-Length']), 2000)
+        response.close()
+        request = RequestFactory().get('/static/app.abc123.css', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(middleware(request).status_code, 304)
+        self.assertIsNone(middleware(RequestFactory().get('/static/missing.css')))
+
+
+class SeedingTests(TestCase):
+    def ledger_rows(self):
+        return sorted(RentLedger.objects.values_list(
+            'building_id', 'year', 'month', 'status', 'payment_count', 'total_amount',
+        ))
+
+    def test_seed(self):
+        run = seed(buildings=2, units_per_building=5, occupancy=0.6, years=1, today=date(2025, 6, 1))
+        self.assertEqual((run.buildings, run.units), (2, 10))
+        self.assertEqual(Tenant.objects.count(), run.tenants)
+        self.assertEqual(RentPayment.objects.count(), run.tenants * 12)
+        self.assertEqual(Unit.objects.filter(status='occupied').count(), run.tenants)
+        self.assertEqual(occupancy.reconcile(), 0)
+        seeded = self.ledger_rows()
+        ledger.rebuild()
+        self.assertEqual(seeded, self.ledger_rows())
+
+    def test_seed_is_reproducible(self):
+        seed(buildings=1, units_per_building=5, prefix='a', today=date(2025, 6, 1))
+        seed(buildings=1, units_per_building=5, prefix='b', today=date(2025, 6, 1))
+        runs = [
+            list(Tenant.objects.filter(id_number__startswith=prefix).order_by('id').values_list('name', 'phone'))
+            for prefix in ('a-', 'b-')
+        ]
+        self.assertEqual(runs[0], runs[1])
+        with self.assertRaises(ValueError):
+            seed(buildings=1, prefix='a')
+
+
+class BenchmarkRegressionTests(SimpleTestCase):
+    def test_regressions(self):
+        baseline = {'route:unit_list': Measurement(0.010, 3, 200)}
+        self.assertEqual(regressions(baseline, {'route:unit_list': Measurement(0.011, 3, 210)}), [])
+        self.assertEqual(regressions(baseline, {'route:new': Measurement(1, 100, 9999)}), [])
+        self.assertEqual(regressions(baseline, {'route:unit_list': Measurement(0.020, 4, 400)}), [
+            'route:unit_list: 3 -> 4 queries',
+            'route:unit_list: 10.0 -> 20.0 ms',
+            'route:unit_list: 200 -> 400 KiB peak memory',
+        ])
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_covers_every_route(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        command = 'core.management.commands.benchmark'
+        # The test runner already provides the throwaway database.
+        with mock.patch(f'{command}.setup_test_environment'), mock.patch(f'{command}.teardown_test_environment'), \
+                mock.patch(f'{command}.DiscoverRunner.setup_databases'), mock.patch(f'{command}.DiscoverRunner.teardown_databases'):
+            call_command(
+                'benchmark', buildings=1, units=4, years=1, repeat=1, only=['route:'],
+                baseline=str(Path(MEDIA_ROOT) / 'missing.json'), stdout=stdout, stderr=stderr,
+            )
+        measured = {line.split()[0] for line in stdout.getvalue().splitlines() if line.startswith('route:')}
+        self.assertEqual(measured, {f'route:{pattern.name}' for pattern in urlpatterns})
+        self.assertEqual(stderr.getvalue(), '')
+
+    @override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_INLINE=True)
+    def test_tenant_routes_are_benchmarked_with_the_tenants_own_data(self):
+        seed(buildings=1, units_per_building=4, years=1, today=date(2025, 6, 15))
+        routes = benchmarks.route_benchmarks(date(2025, 6, 15))
+        for name in ('route:tenant_dashboard', 'route:tenant_payment_receipt'):
+            client, url = routes[name][0].args
+            with self.subTest(route=name):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                response.close()
+
+    @override_settings(MEDIA_ROOT=MEDIA_ROOT, BACKGROUND_TASKS_INLINE=True)
+    def test_routes_are_measured_cold_and_must_succeed(self):
+        seed(buildings=1, units_per_building=4, years=1, today=date(2025, 6, 15))
+        routes = benchmarks.route_benchmarks(date(2025, 6, 15))
+        fetch, setup = routes['route:tenant_list']
+        cache.clear()
+        cold = benchmarks.count_queries(fetch)
+        self.assertLess(benchmarks.count_queries(fetch), cold)
+        self.assertEqual(benchmarks.measure(fetch, setup, repeat=1).queries, cold)
+        client, url = fetch.args
+        with self.assertRaisesMessage(RuntimeError, 'returned 405'):
+            benchmarks._fetch(client, reverse('rent_payment_mark_paid'))
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class LoadTestCommandTests(TransactionTestCase):
+    def test_fixtures_are_removed(self):
+        run = 'core.management.commands.loadtest_payments.Command.run'
+        with mock.patch(run, side_effect=KeyboardInterrupt), self.assertRaises(KeyboardInterrupt):
+            call_command('loadtest_payments', workers=1, writes=1, stdout=io.StringIO())
+        call_command('loadtest_payments', workers=2, writes=3, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual([model.objects.count() for model in (Building, Unit, Tenant, RentPayment)], [0, 0, 0, 0])
+        self.assertFalse(AuditEntry.objects.exists())
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_bench_logins_leaves_nothing_behind(self):
+        stdout = io.StringIO()
+        call_command('bench_logins', workers=1, logins=2, backends=['db'], stdout=stdout, stderr=io.StringIO())
+        self.assertIn('Errors:      0', stdout.getvalue())
+        self.assertFalse(CustomUser.objects.exists())
+        self.assertFalse(AuditEntry.objects.exists())
@@ -1,26 +1,61 @@
 from django.urls import path
-from . import views
+from . import api, lookups, views
 
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('tenant/dashboard/', views.tenant_dashboard, name='tenant_dashboard'),
+    path('tenant/payments/<int:pk>/receipt/', views.tenant_payment_receipt, name='tenant_payment_receipt'),
+    path('import/', views.import_upload, name='import_upload'),
     path('buildings/', views.BuildingListView.as_view(), name='building_list'),
     path('buildings/add/', views.BuildingCreateView.as_view(), name='building_create'),
     path('buildings/<int:pk>/edit/', views.BuildingUpdateView.as_view(), name='building_update'),
     path('buildings/<int:pk>/delete/', views.BuildingDeleteView.as_view(), name='building_delete'),
     path('units/', views.UnitListView.as_view(), name='unit_list'),
+    path('units/search/', views.unit_search, name='unit_search'),
+    path('units/export/<str:fmt>/', views.export_data, {'kind': 'units'}, name='unit_export'),
     path('units/add/', views.UnitCreateView.as_view(), name='unit_create'),
     path('units/<int:pk>/edit/', views.UnitUpdateView.as_view(), name='unit_update'),
     path('units/<int:pk>/delete/', views.UnitDeleteView.as_view(), name='unit_delete'),
     path('tenants/', views.TenantListView.as_view(), name='tenant_list'),
+    path('tenants/export/<str:fmt>/', views.export_data, {'kind': 'tenants'}, name='tenant_export'),
     path('tenants/add/', views.TenantCreateView.as_view(), name='tenant_create'),
     path('tenants/<int:pk>/edit/', views.TenantUpdateView.as_view(), name='tenant_update'),
     path('tenants/<int:pk>/delete/', views.TenantDeleteView.as_view(), name='tenant_delete'),
     path('tenants/<int:pk>/assign/', views.TenantAssignView.as_view(), name='tenant_assign'),
     path('payments/', views.RentPaymentListView.as_view(), name='rent_payment_list'),
+    path('payments/export/<str:fmt>/', views.export_data, {'kind': 'payments'}, name='rent_payment_export'),
+    path('payments/mark-paid/', views.rent_payment_mark_paid, name='rent_payment_mark_paid'),
+    path('payments/reconcile/', views.rent_payment_reconcile, name='rent_payment_reconcile'),
     path('payments/add/', views.RentPaymentCreateView.as_view(), name='rent_payment_create'),
     path('payments/<int:pk>/edit/', views.RentPaymentUpdateView.as_view(), name='rent_payment_update'),
     path('payments/<int:pk>/delete/', views.RentPaymentDeleteView.as_view(), name='rent_payment_delete'),
-]
\ No newline at end of file
+    path('payments/<int:pk>/receipt/', views.rent_payment_receipt, name='rent_payment_receipt'),
+    path('arrears/', views.arrears_report, name='arrears_report'),
+    path('analytics/<str:fmt>/', views.analytics_export, name='analytics_export'),
+    path('lookups/<str:source>/', lookups.lookup_view, name='lookup'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('api/v1/buildings/', api.buildings.list_view, name='building_api_list'),
+    path('api/v1/buildings/<int:pk>/', api.buildings.detail_view, name='building_api_detail'),
+    path('api/v1/units/', api.units.list_view, name='unit_api_list'),
+    path('api/v1/audit/', views.audit_log_api, name='audit_log_api'),
+    path('api/v1/units/search/', views.unit_search_api, name='unit_api_search'),
+    path('api/v1/units/<int:pk>/', api.units.detail_view, name='unit_api_detail'),
+    path('api/v1/tenants/', api.tenants.list_view, name='tenant_api_list'),
+    path('api/v1/tenants/move/', views.tenant_move_api, name='tenant_api_move'),
+    path('api/v1/tenants/<int:pk>/', api.tenants.detail_view, name='tenant_api_detail'),
+    path('api/v1/payments/', api.payments.list_view, name='rent_payment_api_list'),
+    path('api/v1/payments/<int:pk>/', api.payments.detail_view, name='rent_payment_api_detail'),
+]
+
+# Roles allowed on each route, checked by core.middleware.RoleRequiredMiddleware
+# for every HTTP method. Routes are admin-only unless listed below.
+PUBLIC = None
+route_roles = {pattern.name: ('admin',) for pattern in urlpatterns}
+route_roles.update({
+    'login': PUBLIC,
+    'logout': ('admin', 'tenant'),
+    'tenant_dashboard': ('tenant',),
+    'tenant_payment_receipt': ('tenant',),
+})
@@ -1,17 +1,35 @@
-from django.shortcuts import render, redirect
+import json
+
+from django.core.exceptions import ValidationError
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.views.decorators.http import require_POST
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.http import urlencode
 from django.contrib import messages
-from .models import Building, Unit, Tenant, RentPayment
-from .forms import BuildingForm, UnitForm, TenantForm, TenantAssignForm, RentPaymentForm
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import Building, Unit, Tenant, RentPayment, RentLedger, TenantSummary, ArrearsEntry
+from .forms import (
+    BuildingForm, UnitForm, TenantForm, TenantAssignForm, RentPaymentForm,
+    UnitFilterForm, TenantFilterForm, RentPaymentFilterForm, VacancySearchForm, ArrearsForm, AnalyticsForm, AuditQueryForm,
+    ImportForm, MarkPaidForm, ReconcileForm,
+)
+from .importers import import_file
+from .exports import EXPORTS, FORMATS, stream_export
+from .pagination import KeysetPaginationMixin, paginate
+from . import analytics, arrears, audit, caching, ledger, metrics, occupancy, reconciliation, summaries
+from .caching import CachedFragmentMixin
+from .receipts import receipt_path
+from .search import search_units
 
 def login_view(request):
     if request.method == 'POST':
-        email = request.POST['email']
-        password = request.POST['password']
+        email = request.POST.get('email')
+        password = request.POST.get('password')
         user = authenticate(request, username=email, password=password)
         if user is not None:
             login(request, user)
@@ -23,48 +41,241 @@ def login_view(request):
             return render(request, 'core/login.html', {'error': 'Invalid credentials'})
     return render(request, 'core/login.html')
 
-@login_required
 def logout_view(request):
     logout(request)
     return redirect('login')
 
-@login_required
+DASHBOARD_MODELS = (Building, Unit, RentPayment, RentLedger)
+
+@caching.conditional('admin_dashboard', DASHBOARD_MODELS)
 def admin_dashboard(request):
-    if request.user.role != 'admin':
-        messages.error(request, "Access denied: You are not authorized to view this page.")
-        return HttpResponseForbidden("Access denied")
-    return render(request, 'core/admin_dashboard.html')
+    today = timezone.localdate()
+    summary = caching.render_fragment('admin_dashboard', DASHBOARD_MODELS, today, lambda: render_to_string(
+        'core/dashboard_summary.html', ledger.dashboard_summary(today), request,
+    ))
+    return render(request, 'core/admin_dashboard.html', {'summary': mark_safe(summary)})
 
-@login_required
 def tenant_dashboard(request):
-    if request.user.role != 'tenant':
-        messages.error(request, "Access denied: You are not authorized to view this page.")
-        return HttpResponseForbidden("Access denied")
-    return render(request, 'core/tenant_dashboard.html')
-
-class BuildingListView(ListView):
+    tenant = (
+        Tenant.objects.select_related('unit__building', 'summary')
+        .filter(user=request.user).first()
+    )
+    context = {'tenant': tenant}
+    if tenant is not None:
+        page = paginate(
+            RentPayment.objects.filter(tenant=tenant), ('-year', '-month', '-id'), request.GET.get('cursor'), 12,
+        )
+        summary = getattr(tenant, 'summary', None)
+        if summary is None:
+            # Tenants created before summaries existed get theirs on first visit.
+            summaries.refresh([tenant.pk])
+            summary = TenantSummary.objects.get(pk=tenant.pk)
+        context.update({
+            'summary': summary,
+            'payments': page.object_list,
+            'page_obj': page,
+        })
+    return render(request, 'core/tenant_dashboard.html', context)
+
+def import_upload(request):
+    result = None
+    form = ImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            result = import_file(form.cleaned_data['kind'], upload.file, upload.name)
+        except ValueError as e:
+            form.add_error('file', str(e))
+        else:
+            messages.success(request, f"Imported {result.created} of {result.rows} rows in {result.elapsed:.2f}s.")
+    return render(request, 'core/import_form.html', {'form': form, 'result': result})
+
+def export_data(request, kind, fmt):
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404("Unknown export format.")
+    response = StreamingHttpResponse(stream_export(kind, fmt, request.GET), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+@require_POST
+def rent_payment_mark_paid(request):
+    form = MarkPaidForm(request.POST)
+    if form.is_valid():
+        payment_date = form.cleaned_data['payment_date'] or timezone.localdate()
+        pks = form.cleaned_data['payments'].values_list('pk', flat=True)
+        updated = reconciliation.mark_paid(dict.fromkeys(pks, payment_date))
+        messages.success(request, f"Marked {len(updated)} payments as paid.")
+    else:
+        messages.error(request, "Select unpaid payments to mark as paid.")
+    return redirect('rent_payment_list')
+
+def rent_payment_reconcile(request):
+    result = None
+    form = ReconcileForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            result = reconciliation.reconcile_file(upload.file, upload.name)
+        except ValueError as e:
+            form.add_error('file', str(e))
+        else:
+            messages.success(request, f"Matched {result.matched} of {result.lines} statement lines in {result.elapsed:.2f}s.")
+    return render(request, 'core/reconcile_form.html', {'form': form, 'result': result})
+
+def rent_payment_receipt(request, pk):
+    payment = get_object_or_404(RentPayment.objects.select_related('tenant', 'unit__building'), pk=pk, status='paid')
+    return FileResponse(open(receipt_path(payment), 'rb'), filename=f"{payment.receipt_number}.pdf")
+
+def tenant_payment_receipt(request, pk):
+    payment = get_object_or_404(
+        RentPayment.objects.select_related('tenant', 'unit__building'),
+        pk=pk, status='paid', tenant__user=request.user,
+    )
+    return FileResponse(open(receipt_path(payment), 'rb'), filename=f"{payment.receipt_number}.pdf")
+
+def _search_units(request):
+    form = VacancySearchForm(request.GET or None)
+    data = form.get_data()
+    result = search_units(
+        status=data.get('status'), type=data.get('type'), min_rent=data.get('min_rent'),
+        max_rent=data.get('max_rent'), text=data.get('q', ''), building=data.get('building'),
+        cursor=request.GET.get('cursor'),
+    )
+    return form, result
+
+def unit_search(request):
+    form, result = _search_units(request)
+    return render(request, 'core/unit_search.html', {
+        'form': form, 'result': result, 'units': result.page.object_list, 'page_obj': result.page,
+    })
+
+def unit_search_api(request):
+    form, result = _search_units(request)
+    if form.is_bound and not form.is_valid():
+        return JsonResponse({'error': 'Invalid search.', 'errors': form.errors.get_json_data()}, status=400)
+    return JsonResponse({
+        'results': [
+            {
+                'id': unit.pk, 'unit_number': unit.unit_number, 'type': unit.type, 'status': unit.status,
+                'rent_amount': unit.rent_amount, 'building': unit.building_id, 'building_name': unit.building.name,
+                'location': unit.building.location,
+            }
+            for unit in result.page
+        ],
+        'next_cursor': result.page.next_cursor,
+        'total': result.total,
+        'facets': {'type': result.type_facets, 'building': result.building_facets},
+    })
+
+def arrears_report(request):
+    today = timezone.localdate()
+    if request.method == 'POST':
+        # Taking a snapshot writes, so it is a POST; compute_arrears runs the same nightly.
+        form = ArrearsForm(request.POST)
+        if form.is_valid():
+            as_of, building = form.get_data(today)
+            run = arrears.evaluate(as_of)
+            messages.success(request, f"Evaluated {run.entries} overdue payments in {run.elapsed:.2f}s.")
+            query = {'as_of': as_of.isoformat(), **({'building': building.pk} if building else {})}
+            return redirect(f"{reverse('arrears_report')}?{urlencode(query)}")
+    else:
+        form = ArrearsForm(request.GET or None)
+    as_of, building = form.get_data(today)
+    snapshot = ArrearsEntry.objects.filter(as_of=as_of).exists()
+    page = paginate(arrears.tenants_owing(as_of, building), ('name', 'id'), request.GET.get('cursor'), 50)
+    return render(request, 'core/arrears_report.html', {
+        'form': form, 'as_of': as_of, 'snapshot': snapshot, 'totals': arrears.totals(as_of, building),
+        'tenants': page.object_list, 'page_obj': page,
+    })
+
+def analytics_export(request, fmt):
+    if fmt not in ('json', 'csv'):
+        raise Http404("Unknown export format.")
+    form = AnalyticsForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid query.', 'errors': form.errors.get_json_data()}, status=400)
+    start, end = form.cleaned_data['months']
+    data = analytics.series(start, end, form.cleaned_data['building'])
+    if fmt == 'json':
+        return JsonResponse(data)
+    response = HttpResponse(analytics.to_csv(data), content_type='text/csv')
+    name = f"analytics-{data['building'] or 'all'}-{data['labels'][0]}-{data['labels'][-1]}"
+    response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    return response
+
+@require_POST
+def tenant_move_api(request):
+    """Move many tenants in one transaction.
+
+    Body: {"moves": [{"tenant": 1, "unit": 7}, {"tenant": 2, "unit": null}]}
+    """
+    usage = 'Send {"moves": [{"tenant": id, "unit": id or null}, ...]}.'
+    try:
+        moves = json.loads(request.body or b'null')['moves']
+        assignments = {move['tenant']: move['unit'] for move in moves}
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': usage}, status=400)
+    if not moves or not all(
+        isinstance(tenant, int) and (unit is None or isinstance(unit, int)) for tenant, unit in assignments.items()
+    ):
+        return JsonResponse({'error': usage}, status=400)
+    try:
+        moved = occupancy.move_tenants(assignments)
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+    return JsonResponse({'moved': moved})
+
+def audit_log_api(request):
+    form = AuditQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid query.', 'errors': form.errors.get_json_data()}, status=400)
+    page = paginate(audit.history(**form.cleaned_data), ('timestamp', 'id'), request.GET.get('cursor'), 100)
+    return JsonResponse({
+        'results': [
+            {
+                'id': entry.pk, 'timestamp': entry.timestamp, 'model': entry.model, 'object_id': entry.object_id,
+                'action': entry.action, 'user': entry.user_id, 'changes': entry.changes,
+            }
+            for entry in page
+        ],
+        'next_cursor': page.next_cursor,
+    })
+
+def metrics_view(request):
+    return HttpResponse(metrics.histograms.render() + caching.export_stats(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class FilteredListMixin(KeysetPaginationMixin):
+    filter_form_class = None
+
+    def get_filter_form(self):
+        if not hasattr(self, 'filter_form'):
+            self.filter_form = self.filter_form_class(self.request.GET or None)
+        return self.filter_form
+
+    def get_queryset(self):
+        return self.get_filter_form().filter(super().get_queryset())
+
+    def get_ordering(self):
+        return self.get_filter_form().get_ordering()
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('filter_form', self.get_filter_form())
+        return super().get_context_data(**kwargs)
+
+class BuildingListView(CachedFragmentMixin, ListView):
     model = Building
     template_name = 'core/building_list.html'
+    fragment_name = 'building_list'
+    fragment_models = (Building,)
+    fragment_template_name = 'core/building_table.html'
     context_object_name = 'buildings'
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
 class BuildingCreateView(CreateView):
     model = Building
     form_class = BuildingForm
     template_name = 'core/building_form.html'
     success_url = reverse_lazy('building_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Building '{form.instance.name}' created successfully.")
@@ -76,12 +287,6 @@ class BuildingUpdateView(UpdateView):
     template_name = 'core/building_form.html'
     success_url = reverse_lazy('building_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Building '{form.instance.name}' updated successfully.")
@@ -92,12 +297,6 @@ class BuildingDeleteView(DeleteView):
     template_name = 'core/building_confirm_delete.html'
     success_url = reverse_lazy('building_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         name = self.object.name
@@ -105,16 +304,15 @@ class BuildingDeleteView(DeleteView):
         messages.success(self.request, f"Building '{name}' deleted successfully.")
         return response
 
-class UnitListView(ListView):
+class UnitListView(CachedFragmentMixin, FilteredListMixin, ListView):
     model = Unit
+    queryset = Unit.objects.select_related('building')
+    filter_form_class = UnitFilterForm
     template_name = 'core/unit_list.html'
     context_object_name = 'units'
-
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
+    fragment_name = 'unit_list'
+    fragment_models = (Unit, Building)
+    fragment_template_name = 'core/unit_table.html'
 
 class UnitCreateView(CreateView):
     model = Unit
@@ -122,12 +320,6 @@ class UnitCreateView(CreateView):
     template_name = 'core/unit_form.html'
     success_url = reverse_lazy('unit_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Unit '{form.instance.unit_number}' created successfully.")
@@ -139,12 +331,6 @@ class UnitUpdateView(UpdateView):
     template_name = 'core/unit_form.html'
     success_url = reverse_lazy('unit_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Unit '{form.instance.unit_number}' updated successfully.")
@@ -155,12 +341,6 @@ class UnitDeleteView(DeleteView):
     template_name = 'core/unit_confirm_delete.html'
     success_url = reverse_lazy('unit_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         unit_number = self.object.unit_number
@@ -168,16 +348,15 @@ class UnitDeleteView(DeleteView):
         messages.success(self.request, f"Unit '{unit_number}' deleted successfully.")
         return response
 
-class TenantListView(ListView):
+class TenantListView(CachedFragmentMixin, FilteredListMixin, ListView):
     model = Tenant
+    queryset = Tenant.objects.select_related('unit')
+    filter_form_class = TenantFilterForm
     template_name = 'core/tenant_list.html'
     context_object_name = 'tenants'
-
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
+    fragment_name = 'tenant_list'
+    fragment_models = (Tenant, Unit, Building)
+    fragment_template_name = 'core/tenant_table.html'
 
 class TenantCreateView(CreateView):
     model = Tenant
@@ -185,12 +364,6 @@ class TenantCreateView(CreateView):
     template_name = 'core/tenant_form.html'
     success_url = reverse_lazy('tenant_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Tenant '{form.instance.name}' created successfully.")
@@ -202,12 +375,6 @@ class TenantUpdateView(UpdateView):
     template_name = 'core/tenant_form.html'
     success_url = reverse_lazy('tenant_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Tenant '{form.instance.name}' updated successfully.")
@@ -218,12 +385,6 @@ class TenantDeleteView(DeleteView):
     template_name = 'core/tenant_confirm_delete.html'
     success_url = reverse_lazy('tenant_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         name = self.object.name
@@ -237,28 +398,21 @@ class TenantAssignView(UpdateView):
     template_name = 'core/tenant_assign.html'
     success_url = reverse_lazy('tenant_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         unit_display = form.instance.unit.unit_number if form.instance.unit else "unassigned"
         messages.success(self.request, f"Tenant '{form.instance.name}' assigned to unit '{unit_display}' successfully.")
         return response
 
-class RentPaymentListView(ListView):
+class RentPaymentListView(CachedFragmentMixin, FilteredListMixin, ListView):
     model = RentPayment
+    queryset = RentPayment.objects.select_related('tenant', 'unit')
+    filter_form_class = RentPaymentFilterForm
     template_name = 'core/rent_payment_list.html'
     context_object_name = 'payments'
-
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
+    fragment_name = 'rent_payment_list'
+    fragment_models = (RentPayment, Tenant, Unit, Building)
+    fragment_template_name = 'core/rent_payment_table.html'
 
 class RentPaymentCreateView(CreateView):
     model = RentPayment
@@ -266,12 +420,6 @@ class RentPaymentCreateView(CreateView):
     template_name = 'core/rent_payment_form.html'
     success_url = reverse_lazy('rent_payment_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Payment for {form.instance.tenant.name} ({form.instance.month}/{form.instance.year}) created successfully.")
@@ -283,12 +431,6 @@ class RentPaymentUpdateView(UpdateView):
     template_name = 'core/rent_payment_form.html'
     success_url = reverse_lazy('rent_payment_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"Payment for {form.instance.tenant.name} ({form.instance.month}/{form.instance.year}) updated successfully.")
@@ -299,12 +441,6 @@ class RentPaymentDeleteView(DeleteView):
     template_name = 'core/rent_payment_confirm_delete.html'
     success_url = reverse_lazy('rent_payment_list')
 
-    def get(self, request, *args, **kwargs):
-        if request.user.role != 'admin':
-            messages.error(request, "Access denied: You are not authorized to view this page.")
-            return HttpResponseForbidden("Access denied")
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         tenant_name = self.object.tenant.name
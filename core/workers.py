@@ -0,0 +1,41 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='core-worker',
+            )
+            atexit.register(_executor.shutdown)
+    return _executor
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Background task failed", exc_info=future.exception())
+
+
+def submit(fn, *args, **kwargs):
+    if getattr(settings, 'BACKGROUND_TASKS_INLINE', False):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+    else:
+        future = get_executor().submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future